@@ -1,13 +1,25 @@
-from flask import Flask, request
+from flask import Flask, Response, g, request, stream_with_context
 from flask_cors import CORS
+from pymongo.errors import PyMongoError
 from config import Config
 from db import Database
-from services import extract_text_from_pdf_url, map_services_and_tools, generate_portfolio
+from services import resume_cache
+from output_parser import PortfolioParseError, parse_stats
+from pipeline import UserNotFoundError, normalize_user_id, serve_portfolio, run_portfolio_pipeline, run_batch_pipeline, prepare_portfolio_inputs
+from streaming import stream_portfolio_events
+from stages import StageTimeoutError, add_stage_observer
+from jobs import JobManager, JobQueueFullError, create_job_store
+from coalesce import create_single_flight
+from portfolio_store import PortfolioStore
+from llm import llm_registry, llm_priority, LLMOverloadedError, BACKGROUND
+from http_client import reset_session
+from pdf_extraction import reset_process_pool
+from metrics import registry, http_request_seconds, start_trace, finish_trace, record_stage_run, snapshot_lines
 from utils import error_response, success_response, setup_logging
 import logging
 import json
-import re
-from bson import ObjectId  # Ensure ObjectId is imported
+import time
+import threading
 
 app = Flask(__name__)
 CORS(app)
@@ -20,127 +32,242 @@ except ValueError as ve:
     logging.error(f"Configuration Error: {ve}")
     exit(1)
 
-db = Database()
+if Config.ENSURE_INDEXES:
+    # Runs once at import (in the gunicorn master when preloading) on a
+    # short-lived client that is closed before any worker forks.
+    index_db = Database()
+    try:
+        index_db.ensure_indexes()
+    except RuntimeError as ie:
+        logging.error(f"Index Error: {ie}")
+        exit(1)
+    except PyMongoError as me:
+        logging.error(f"Database Error: {me}")
+        exit(1)
+    finally:
+        index_db.close()
+
+# MongoClient, the job pool and LLM clients own sockets and threads, which
+# do not survive fork. They are created per process on first use (or in
+# gunicorn's post_fork hook), never in the preloading master.
+db = None
+job_manager = None
+flights = None
+portfolio_store = None
+draining = threading.Event()
+_worker_lock = threading.Lock()
+
+def init_worker():
+    global db, job_manager, flights, portfolio_store
+    with _worker_lock:
+        if db is None:
+            db = Database()
+            flights = create_single_flight(db)
+            portfolio_store = PortfolioStore(db.portfolios_collection) if Config.PORTFOLIO_STORE else None
+            job_manager = JobManager(
+                create_job_store(db),
+                lambda user_id: run_background_pipeline(user_id)
+            )
+            if Config.LLM_WARMUP:
+                llm_registry.warm_up()
+            if Config.METRICS_DIR:
+                registry.enable_multiprocess(Config.METRICS_DIR, Config.METRICS_FLUSH_INTERVAL)
+    return db
+
+def run_background_pipeline(user_id):
+    # Jobs have a client polling for them, so they yield the LLM to
+    # interactive requests.
+    with llm_priority(BACKGROUND):
+        return run_portfolio_pipeline(db, user_id, flights, portfolio_store)
+
+def get_db():
+    return db if db is not None else init_worker()
+
+def get_job_manager():
+    if job_manager is None:
+        init_worker()
+    return job_manager
+
+def reset_forked_state():
+    # Drops anything a forked worker inherited from the master instead of
+    # sharing the parent's connections or pool processes.
+    llm_registry.clear()
+    reset_session()
+    reset_process_pool()
+
+def drain():
+    # Called from gunicorn's worker_exit once the worker stops accepting
+    # requests (readiness already flipped to 503 when SIGTERM arrived):
+    # queued jobs are failed so clients resubmit elsewhere, and running
+    # jobs finish before the clients close.
+    draining.set()
+    if job_manager is not None:
+        job_manager.shutdown(wait=True, cancel_pending=True)
+    if db is not None:
+        db.close()
+    if registry.multiprocess_dir is not None:
+        registry.flush()
+
+add_stage_observer(record_stage_run)
+registry.add_collector(lambda: snapshot_lines(
+    "portfolio_resume_cache", "Resume text cache statistics.", "gauge", resume_cache.stats(), "stat"))
+registry.add_collector(lambda: snapshot_lines(
+    "portfolio_parse_outcomes_total", "Model output parse outcomes.", "counter", parse_stats.snapshot(), "outcome"))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if Config.TRACE_REQUESTS:
+        g.trace, g.trace_token = start_trace(method=request.method, path=request.path)
+
+@app.after_request
+def record_request_metrics(response):
+    # Streaming responses are timed until their headers are sent
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    http_request_seconds.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    if Config.TRACE_REQUESTS and "trace_token" in g:
+        finish_trace(g.pop("trace_token"), status=response.status_code, ms=round(elapsed * 1000, 2))
+    return response
 
-def validate_user_data(user, freelancer):
-    if user:
-        required_user_fields = ['first_name', 'last_name', 'github_profile', 'profile_photo']
-        for field in required_user_fields:
-            if field not in user:
-                logging.warning(f"User data missing field: {field}")
-    if freelancer:
-        required_freelancer_fields = ['name', 'work_description', 'portfolio_website', 'skills', 'tools']
-        for field in required_freelancer_fields:
-            if field not in freelancer:
-                logging.warning(f"Freelancer data missing field: {field}")
+def get_request_user_id():
+    data = request.get_json(silent=True)
+    if not data or 'user_id' not in data:
+        raise ValueError("Missing 'user_id' in request data.")
+    return normalize_user_id(data['user_id'])
 
 @app.route('/generate_portfolio', methods=['POST'])
 def generate_portfolio_api():
     try:
-        data = request.get_json()
-        if not data or 'user_id' not in data:
-            return error_response("Missing 'user_id' in request data.", 400)
-        
-        user_id = data['user_id'].strip()
-        if not user_id:
-            return error_response("Empty 'user_id' provided.", 400)
-        
-        # Validate user_id format
-        if not ObjectId.is_valid(user_id):
-            return error_response("Invalid 'user_id' format.", 400)
-
-        # Fetch user and freelancer data
-        freelancer = db.get_freelancer(user_id)
-        user = db.get_user(user_id)
-
-        if not freelancer and not user:
-            return error_response("User not found.", 404)
-
-        # Validate fetched data
-        validate_user_data(user, freelancer)
-
-        # Extract resume text if available
-        resume_text = None
-        if freelancer and "resume" in freelancer and isinstance(freelancer["resume"], dict):
-            resume_info = freelancer["resume"]
-            resume_url = resume_info.get("url")
-            if resume_url:
-                try:
-                    resume_text = extract_text_from_pdf_url(resume_url)
-                except Exception as e:
-                    logging.error(f"Error extracting resume text: {e}")
-                    resume_text = None
-
-        # Construct freelancer name
-        freelancer_name = "N/A"
-        if user:
-            first_name = user.get("first_name", "").strip()
-            last_name = user.get("last_name", "").strip()
-            full_name = (first_name + " " + last_name).strip()
-            if full_name:
-                freelancer_name = full_name
-        if (freelancer_name == "N/A" or not freelancer_name) and freelancer:
-            freelancer_name = freelancer.get("name", "N/A")
-
-        # Safeguard the 'work_description' processing
-        about = ""
-        if freelancer and "work_description" in freelancer:
-            work_description = freelancer["work_description"]
-            if isinstance(work_description, str):
-                about = re.sub(r"<.*?>", "", work_description).strip()
-            else:
-                logging.warning(f"'work_description' is not a string: {work_description}")
-                about = ""
-
-        # Extract other details
-        github_link = user.get("github_profile") if user else None
-        portfolio_website = freelancer.get("portfolio_website") if freelancer else ""
-        portfolio_website = portfolio_website or ""  # Ensure string
-        project_links = freelancer.get("project_links") if freelancer else ""
-        project_links = project_links or ""  # Ensure string
-        linkedin_link = freelancer.get("linkedIn_profile") if freelancer else None
-
-        behance_link = portfolio_website if "behance.net" in portfolio_website else None
-        dribbble_link = project_links if "dribbble.com" in project_links else None
-        portfolio_link = portfolio_website if portfolio_website.strip() and not behance_link and not dribbble_link else None
-
-        freelancer_skills = freelancer.get("skills", []) if freelancer else []
-        freelancer_tools = freelancer.get("tools", []) if freelancer else []
-        combined_skills = freelancer_skills + freelancer_tools
-        matched_services, matched_tools = map_services_and_tools(combined_skills)
-
-        profile_photo = user.get("profile_photo") if user and "profile_photo" in user else None
-        if not profile_photo and freelancer and "profile_photo" in freelancer:
-            profile_photo = freelancer["profile_photo"]
-
-        # Prepare data for AI
-        portfolio_data = {
-            "full_name": freelancer_name,
-            "about": about,
-            "github_link": github_link,
-            "behance_link": behance_link,
-            "dribbble_link": dribbble_link,
-            "portfolio_link": portfolio_link,
-            "linkedin_link": linkedin_link,
-            "profile_photo": profile_photo,
-            "services": matched_services,
-            "tools": matched_tools
-        }
-
-        # Generate portfolio using AI
-        portfolio_json = generate_portfolio(portfolio_data, resume_text)
-
-        return success_response(portfolio_json)
-    
+        user_id = get_request_user_id()
+        portfolio_json, info = serve_portfolio(get_db(), user_id, flights, portfolio_store)
+        response = success_response(portfolio_json, etag=info["etag"])
+        response.headers["X-Portfolio-Source"] = info["source"]
+        if info["reused_sections"]:
+            response.headers["X-Portfolio-Reused-Sections"] = ",".join(info["reused_sections"])
+        return response
+
+    except UserNotFoundError as nf:
+        return error_response(str(nf), 404)
+    except StageTimeoutError as te:
+        logging.error(f"Timeout: {te}")
+        return error_response("Portfolio generation timed out.", 504)
+    except PortfolioParseError as pe:
+        return error_response(str(pe), 502)
+    except LLMOverloadedError as oe:
+        response = error_response(str(oe), 429)
+        response.headers["Retry-After"] = str(oe.retry_after)
+        return response
     except ValueError as ve:
         logging.error(f"ValueError: {ve}")
         return error_response(str(ve), 400)
     except Exception as e:
         logging.error(f"Unhandled exception: {e}", exc_info=True)
         return error_response("Internal Server Error.", 500)
-    
-    finally:
-        pass  # Optionally, perform any cleanup here
+
+@app.route('/generate_portfolio/stream', methods=['POST'])
+def generate_portfolio_stream_api():
+    try:
+        user_id = get_request_user_id()
+        # Lookup and resume errors are reported as plain HTTP errors before
+        # the event stream starts.
+        portfolio_data, resume_text = prepare_portfolio_inputs(get_db(), user_id)
+    except UserNotFoundError as nf:
+        return error_response(str(nf), 404)
+    except StageTimeoutError as te:
+        logging.error(f"Timeout: {te}")
+        return error_response("Portfolio generation timed out.", 504)
+    except ValueError as ve:
+        return error_response(str(ve), 400)
+    except Exception as e:
+        logging.error(f"Unhandled exception: {e}", exc_info=True)
+        return error_response("Internal Server Error.", 500)
+
+    return Response(
+        stream_with_context(stream_portfolio_events(portfolio_data, resume_text)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/generate_portfolios', methods=['POST'])
+def generate_portfolios_api():
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('user_ids'), list):
+        return error_response("Missing 'user_ids' list in request data.", 400)
+
+    # Preserve request order while dropping duplicates
+    user_ids = list(dict.fromkeys(u.strip() if isinstance(u, str) else u for u in data['user_ids']))
+    if not user_ids:
+        return error_response("Empty 'user_ids' provided.", 400)
+    if len(user_ids) > Config.BATCH_MAX_USERS:
+        return error_response(f"At most {Config.BATCH_MAX_USERS} user_ids per batch.", 400)
+
+    def stream():
+        try:
+            for result in run_batch_pipeline(get_db(), user_ids):
+                yield json.dumps(result, default=str) + "\n"
+        except Exception as e:
+            logging.error(f"Batch generation aborted: {e}", exc_info=True)
+            yield json.dumps({"status": 500, "error": "Internal Server Error."}) + "\n"
+
+    return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+@app.route('/portfolio_jobs', methods=['POST'])
+def submit_portfolio_job_api():
+    try:
+        user_id = get_request_user_id()
+        job, created = get_job_manager().submit(user_id)
+        response = success_response({"job_id": job["job_id"], "status": job["status"], "created": created}, 202)
+        response.headers["Location"] = f"/portfolio_jobs/{job['job_id']}"
+        return response
+
+    except JobQueueFullError as qf:
+        response = error_response(str(qf), 503)
+        response.headers["Retry-After"] = "5"
+        return response
+    except ValueError as ve:
+        return error_response(str(ve), 400)
+    except Exception as e:
+        logging.error(f"Unhandled exception: {e}", exc_info=True)
+        return error_response("Internal Server Error.", 500)
+
+@app.route('/portfolio_jobs/<job_id>', methods=['GET'])
+def get_portfolio_job_api(job_id):
+    try:
+        job = get_job_manager().get(job_id)
+        if not job:
+            return error_response("Job not found.", 404)
+        return success_response(job)
+    except Exception as e:
+        logging.error(f"Unhandled exception: {e}", exc_info=True)
+        return error_response("Internal Server Error.", 500)
+
+@app.route('/resume_cache/stats', methods=['GET'])
+def resume_cache_stats_api():
+    return success_response(resume_cache.stats())
+
+@app.route('/healthz', methods=['GET'])
+def liveness_api():
+    return success_response({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readiness_api():
+    if draining.is_set():
+        return error_response("Draining.", 503)
+    try:
+        get_db().ping()
+        return success_response({"status": "ready"})
+    except Exception as e:
+        logging.error(f"Readiness check failed: {e}")
+        return error_response("MongoDB is unreachable.", 503)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/portfolio_parser/stats', methods=['GET'])
+def portfolio_parser_stats_api():
+    return success_response(parse_stats.snapshot())
 
 @app.errorhandler(404)
 def not_found(e):
@@ -155,4 +282,6 @@ def internal_error(e):
     return error_response("Internal server error.", 500)
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000)
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    init_worker()
+    app.run(host='0.0.0.0', port=Config.PORT)
@@ -0,0 +1,108 @@
+# asgi_app.py
+# Async serving mode: the /generate_portfolio request and error contract of
+# app.py on Starlette, motor and httpx. Run with
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+# Every request generates: the portfolio store, request coalescing and the
+# X-Portfolio-* headers of app.py (all built on the synchronous pymongo
+# Database) are not available in this mode.
+import time
+import asyncio
+import logging
+import contextlib
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from config import Config
+from db import AsyncDatabase
+from pipeline import UserNotFoundError, normalize_user_id
+from async_pipeline import run_portfolio_pipeline_async
+from http_client import build_async_client
+from output_parser import PortfolioParseError
+from stages import StageTimeoutError, add_stage_observer
+from llm import llm_registry, LLMOverloadedError
+from metrics import registry, http_request_seconds, record_stage_run
+from utils import setup_logging
+
+setup_logging()
+
+# Validate configuration on startup
+try:
+    Config.validate()
+except ValueError as ve:
+    logging.error(f"Configuration Error: {ve}")
+    exit(1)
+
+add_stage_observer(record_stage_run)
+
+def error_response(message, status_code=400):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+async def get_request_user_id(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'user_id' not in data:
+        raise ValueError("Missing 'user_id' in request data.")
+    return normalize_user_id(data['user_id'])
+
+async def generate_portfolio(request):
+    try:
+        user_id = await get_request_user_id(request)
+        portfolio_json = await run_portfolio_pipeline_async(request.app.state.db, request.app.state.http, user_id)
+        return JSONResponse(portfolio_json)
+
+    except UserNotFoundError as nf:
+        return error_response(str(nf), 404)
+    except StageTimeoutError as te:
+        logging.error(f"Timeout: {te}")
+        return error_response("Portfolio generation timed out.", 504)
+    except PortfolioParseError as pe:
+        return error_response(str(pe), 502)
+    except LLMOverloadedError as oe:
+        response = error_response(str(oe), 429)
+        response.headers["Retry-After"] = str(oe.retry_after)
+        return response
+    except ValueError as ve:
+        logging.error(f"ValueError: {ve}")
+        return error_response(str(ve), 400)
+    except Exception as e:
+        logging.error(f"Unhandled exception: {e}", exc_info=True)
+        return error_response("Internal Server Error.", 500)
+
+async def generate_portfolio_api(request):
+    started = time.perf_counter()
+    response = await generate_portfolio(request)
+    http_request_seconds.observe(time.perf_counter() - started, route="/generate_portfolio",
+                                 method="POST", status=response.status_code)
+    return response
+
+async def metrics_api(request):
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.db = AsyncDatabase()
+    app.state.http = build_async_client()
+    if Config.LLM_WARMUP:
+        await asyncio.get_running_loop().run_in_executor(None, llm_registry.warm_up)
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        app.state.db.close()
+
+app = Starlette(
+    routes=[
+        Route('/generate_portfolio', generate_portfolio_api, methods=['POST']),
+        Route('/metrics', metrics_api, methods=['GET'])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
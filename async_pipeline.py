@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+from config import Config
+from services import (
+    resume_cache, resume_validators, ResumeSpool, extract_text_from_pdf, build_portfolio_prompt,
+    parse_portfolio_response, render_section_prompt, deterministic_fields, NARRATIVE_SECTIONS
+)
+from prompt_builder import build_prompt
+from http_client import conditional_headers
+from llm import get_llm, llm_scheduler
+from metrics import span, record_llm_usage
+from output_parser import validate_section
+from stages import StageRun, StageTimeoutError, stage_executor, notify_stage_observers
+from pipeline import UserNotFoundError, validate_user_data, build_portfolio_data
+
+def offload(func, *args):
+    # CPU-bound or still-blocking work (PDF parsing, the JSON fix call) runs
+    # on the stage pool so the event loop keeps serving other requests.
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(stage_executor, functools.partial(contextvars.copy_context().run, func, *args))
+
+async def extract_text_from_pdf_url_async(client, url):
+    try:
+        validators = resume_validators.get(url)
+        with span("resume.request"):
+            response = await client.send(client.build_request("GET", url, headers=conditional_headers(validators)), stream=True)
+        try:
+            if response.status_code == 304 and validators:
+                cached_text = resume_cache.get(url, validators["content_hash"])
+                if cached_text is not None:
+                    return cached_text
+                # Validators outlived the cached text; fetch the full body again
+                resume_validators.discard(url)
+                await response.aclose()
+                with span("resume.request"):
+                    response = await client.send(client.build_request("GET", url), stream=True)
+
+            response.raise_for_status()
+            spool = ResumeSpool(response.headers.get("Content-Length"))
+            try:
+                with span("resume.download"):
+                    async for chunk in response.aiter_bytes(64 * 1024):
+                        spool.write(chunk)
+                stream, content_hash = spool.finish()
+                resume_validators.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), content_hash)
+
+                cached_text = resume_cache.get(url, content_hash)
+                if cached_text is not None:
+                    return cached_text
+
+                started = time.perf_counter()
+                with span("resume.extract"):
+                    cleaned_text = await offload(extract_text_from_pdf, stream)
+                resume_cache.put(url, content_hash, cleaned_text, time.perf_counter() - started)
+                return cleaned_text
+            finally:
+                spool.close()
+        finally:
+            await response.aclose()
+    except Exception as e:
+        logging.error(f"Error extracting text from PDF: {e}")
+        raise e
+
+async def extract_resume_text_async(client, freelancer):
+    if freelancer and "resume" in freelancer and isinstance(freelancer["resume"], dict):
+        resume_url = freelancer["resume"].get("url")
+        if resume_url:
+            return await extract_text_from_pdf_url_async(client, resume_url)
+    return None
+
+async def invoke_llm_async(prompt, span_name, model=None, temperature=None):
+    await llm_scheduler.acquire_async()
+    try:
+        with span(span_name):
+            ai_message = await get_llm(model=model, temperature=temperature).ainvoke(prompt)
+    finally:
+        llm_scheduler.release()
+    record_llm_usage(model or Config.LLM_MODEL, ai_message)
+    return ai_message
+
+async def generate_section_async(section, data, resume_text):
+    prompt = build_prompt(lambda resume: render_section_prompt(section, data, resume), resume_text)
+    ai_message = await invoke_llm_async(prompt.text, "llm.section")
+    parsed = await offload(parse_portfolio_response, ai_message.content,
+                           lambda document: validate_section(section, document))
+    return parsed[section]
+
+async def generate_portfolio_async(data, resume_text):
+    try:
+        if Config.GENERATION_MODE == "sectioned":
+            portfolio = deterministic_fields(data)
+            sections = await asyncio.gather(
+                *(generate_section_async(section, data, resume_text) for section in NARRATIVE_SECTIONS))
+            portfolio.update(zip(NARRATIVE_SECTIONS, sections))
+            return portfolio
+        prompt = build_portfolio_prompt(data, resume_text)
+        ai_message = await invoke_llm_async(prompt.text, "llm.generate")
+        return await offload(parse_portfolio_response, ai_message.content)
+    except Exception as e:
+        logging.error(f"Error generating portfolio: {e}")
+        raise e
+
+async def run_stage(name, awaitable, timeout, timings):
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise StageTimeoutError(f"Stage '{name}' exceeded its {timeout}s deadline.")
+    timings[name] = time.perf_counter() - started
+    return result
+
+async def run_portfolio_pipeline_async(db, client, user_id):
+    # Same stages, deadlines and resume fallback as pipeline.build_stage_graph,
+    # as coroutines: waiting on Mongo, the resume host or Gemini holds no thread.
+    timings = {}
+    degraded = []
+    user, freelancer = await run_stage("profile", db.get_profile(user_id), Config.PROFILE_STAGE_TIMEOUT, timings)
+    if not freelancer and not user:
+        raise UserNotFoundError("User not found.")
+    validate_user_data(user, freelancer)
+
+    started = time.perf_counter()
+    details = build_portfolio_data(user, freelancer)
+    timings["details"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        resume_text = await run_stage("resume", extract_resume_text_async(client, freelancer),
+                                      Config.RESUME_STAGE_TIMEOUT, timings)
+    except Exception as e:
+        logging.warning(f"Stage 'resume' degraded: {e}")
+        resume_text = None
+        timings["resume"] = time.perf_counter() - started
+        degraded.append("resume")
+
+    portfolio = await run_stage("generate", generate_portfolio_async(details, resume_text),
+                                Config.LLM_STAGE_TIMEOUT, timings)
+    notify_stage_observers(StageRun(
+        {"profile": (user, freelancer), "details": details, "resume": resume_text, "generate": portfolio},
+        timings, degraded
+    ))
+    return portfolio
@@ -0,0 +1,661 @@
+# benchmark.py
+# Local micro-benchmarks for the portfolio pipeline. Nothing here talks to
+# the real Gemini API or MongoDB; every dependency is served from localhost.
+#
+#   python benchmark.py llm_client --requests 50
+#   python benchmark.py resume_memory --pages 400 --padding-kb 512
+#   python benchmark.py page_extraction --requests 5
+#   python benchmark.py normalizer --requests 20
+#   python benchmark.py catalog --requests 20
+#   python benchmark.py prompt_size
+#   python benchmark.py e2e --requests 200 --concurrency 16 --llm-latency 0.5
+#   python benchmark.py asgi --requests 200 --concurrency 8 --llm-latency 1
+#   python benchmark.py cold_start --requests 10
+#   python benchmark.py responses --requests 200 --llm-kb 16
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StandInServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections under load tests
+    request_queue_size = 1024
+    daemon_threads = True
+
+def start_server(handler_class):
+    server = StandInServer(("127.0.0.1", 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def start_server_process(handler_class):
+    # Serves from a forked child so the stand-in's threads and GIL do not
+    # count against the app under test. Class attributes set before the
+    # call (latency, documents) are inherited by the child.
+    import multiprocessing
+    server = StandInServer(("127.0.0.1", 0), handler_class)
+    process = multiprocessing.get_context("fork").Process(target=server.serve_forever, daemon=True)
+    process.start()
+    server.socket.close()
+    return process, f"http://127.0.0.1:{server.server_address[1]}"
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    def pct(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+    print(f"{label:<32} n={len(samples):<5} mean={statistics.mean(samples) * 1000:8.2f}ms "
+          f"p50={pct(50) * 1000:8.2f}ms p95={pct(95) * 1000:8.2f}ms p99={pct(99) * 1000:8.2f}ms")
+
+# ---------------------------------------------------------
+# Synthetic PDFs
+# ---------------------------------------------------------
+def make_pdf(pages, lines_per_page=40, padding_bytes=0):
+    # Minimal uncompressed PDF with one Helvetica text stream per page. The
+    # optional padding stream on each page mimics the bulk of a scanned deck.
+    objects = []
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for page_number in range(pages):
+        lines = [f"Page {page_number + 1} line {i}: Senior engineer building scalable web platforms." for i in range(lines_per_page)]
+        text = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text.encode("latin-1")))
+        resources = f"<< /Font << /F1 {font} 0 R >> >>"
+        if padding_bytes:
+            padding = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (padding_bytes, os.urandom(padding_bytes)))
+            resources = f"<< /Font << /F1 {font} 0 R >> /XObject << >> /Padding {padding} 0 R >>"
+        kids.append(add(f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 612 842] "
+                        f"/Contents {content} 0 R /Resources {resources} >>".encode("latin-1")))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode("latin-1")
+    objects[pages_obj - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] "
+                              f"/Count {len(kids)} >>").encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+class PDFHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    documents = {}
+
+    def do_GET(self):
+        body = self.documents.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client rejected the body part-way through (size limit)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def bench_resume_memory(args):
+    import tracemalloc
+    import tempfile
+    os.environ["RESUME_CACHE_DIR"] = tempfile.mkdtemp()
+    PDFHandler.documents["/large.pdf"] = make_pdf(args.pages, padding_bytes=args.padding_kb * 1024)
+    server, base_url = start_server(PDFHandler)
+
+    import services
+    from config import Config
+    size_mb = len(PDFHandler.documents["/large.pdf"]) / 1e6
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        text = services.extract_text_from_pdf_url(f"{base_url}/large.pdf")
+        outcome = f"{len(text)} chars"
+    except services.ResumeTooLargeError as e:
+        outcome = f"rejected: {e}"
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"pdf={size_mb:.1f}MB pages={args.pages} -> {outcome} in {elapsed:.2f}s")
+    print(f"peak python heap {peak / 1e6:.1f}MB of {Config.RESUME_PEAK_MEMORY_BYTES / 1e6:.1f}MB ceiling "
+          f"(spool threshold {services.spool_threshold() / 1e6:.1f}MB, "
+          f"max pages {Config.RESUME_MAX_PAGES}, max chars {Config.RESUME_MAX_CHARS})")
+    server.shutdown()
+
+def bench_page_extraction(args):
+    import io
+    import pdf_extraction
+    from config import Config
+    Config.RESUME_MAX_PAGES = 1000
+
+    for pages in (1, 10, 100):
+        document = make_pdf(pages, lines_per_page=60)
+        for label, min_pages in (("inline", 10 ** 9), ("process pool", 2)):
+            Config.PDF_PARALLEL_MIN_PAGES = min_pages
+            list(pdf_extraction.extract_page_texts(io.BytesIO(document)))  # warm the pool
+            samples = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                texts = list(pdf_extraction.extract_page_texts(io.BytesIO(document)))
+                samples.append(time.perf_counter() - started)
+            assert len(texts) == pages
+            summarize(f"{pages:>3} pages, {label}", samples)
+    pdf_extraction.shutdown_process_pool()
+
+# ---------------------------------------------------------
+# Resume text normalizer
+# ---------------------------------------------------------
+def legacy_normalize(text_content):
+    # The multi-pass cleanup extract_text_from_pdf_url used before normalizer.py
+    import re
+    all_text = "\n".join(text_content)
+    all_text = re.sub(r"[ \t]+", " ", all_text)
+    all_text = re.sub(r"(\r\n|\r|\n)+", "\n", all_text)
+    lines = all_text.split("\n")
+    cleaned_lines = []
+    for line in lines:
+        parts = line.split(" ")
+        single_chars = sum(len(p) == 1 for p in parts if p.strip())
+        if len(parts) > 1 and single_chars > (len(parts) / 2):
+            new_line_words = []
+            current_word_chars = []
+            for token in parts:
+                if len(token) == 1:
+                    current_word_chars.append(token)
+                else:
+                    if current_word_chars:
+                        new_line_words.append("".join(current_word_chars))
+                        current_word_chars = []
+                    new_line_words.append(token)
+            if current_word_chars:
+                new_line_words.append("".join(current_word_chars))
+            cleaned_lines.append(" ".join(new_line_words))
+        else:
+            cleaned_lines.append(line)
+    return "\n".join(l.strip() for l in cleaned_lines if l.strip())
+
+def normalizer_corpus(pages=200, seed=7):
+    import random
+    rng = random.Random(seed)
+    samples = [
+        "J o h n   D o e", "S E N I O R\tE N G I N E E R", "Built  a  React\tdashboard for 40k users.",
+        "", "   ", "\r\n", "E x p e r i e n c e", "2019 - 2023  Acme Corp, Berlin",
+        "Skills: Python, Go, AWS, Kubernetes", "a b cd", " x y z ", "\x0c", "Led a team of 5 engineers."
+    ]
+    return ["\n".join(rng.choice(samples) for _ in range(120)) for _ in range(pages)]
+
+def bench_normalizer(args):
+    import tracemalloc
+    from normalizer import normalize_resume_text
+    corpus = normalizer_corpus()
+    assert normalize_resume_text(corpus) == legacy_normalize(corpus), "normalizer output diverged"
+    for seed in range(50):
+        fixture = normalizer_corpus(pages=3, seed=seed)
+        assert normalize_resume_text(fixture) == legacy_normalize(fixture), f"diverged on fixture {seed}"
+
+    megabytes = sum(len(page) for page in corpus) / 1e6
+    for label, func in (("legacy multi-pass", legacy_normalize), ("single-pass normalizer", normalize_resume_text)):
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            func(corpus)
+            samples.append((time.perf_counter() - started) / megabytes)
+        tracemalloc.start()
+        func(corpus)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        summarize(f"{label} (per MB)", samples)
+        print(f"{'':<32} peak allocations {peak / 1e6 / megabytes:.2f}MB per MB of text")
+
+# ---------------------------------------------------------
+# Skill catalog matching
+# ---------------------------------------------------------
+def legacy_map_services_and_tools(skills):
+    # List-scan matching used before catalog.CatalogIndex
+    from catalog import SERVICES_MAPPING, TOOLS_LIST
+    matched_services = []
+    for category, items in SERVICES_MAPPING.items():
+        category_matches = [s for s in skills if s in items]
+        if category_matches:
+            matched_services.append({"category": category, "services": category_matches})
+    matched_tools = [t for t in skills if t in TOOLS_LIST]
+    return matched_services, matched_tools
+
+def bench_catalog(args):
+    import random
+    from catalog import SERVICES_MAPPING, TOOLS_LIST, catalog_index
+    rng = random.Random(3)
+    vocabulary = list(TOOLS_LIST) + [s for items in SERVICES_MAPPING.values() for s in items]
+    vocabulary += [f"Unlisted Skill {i}" for i in range(len(vocabulary))]
+    print(f"catalog: {len(SERVICES_MAPPING)} categories, {len(TOOLS_LIST)} tools")
+    for size in (10, 100, 1000, 10000):
+        skills = [rng.choice(vocabulary) for _ in range(size)]
+        for label, func in (("list scan", legacy_map_services_and_tools), ("catalog index", catalog_index.match)):
+            samples = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                func(skills)
+                samples.append(time.perf_counter() - started)
+            summarize(f"{size:>5} skills, {label}", samples)
+
+# ---------------------------------------------------------
+# Prompt size
+# ---------------------------------------------------------
+def long_resume(roles=40):
+    sections = ["Jane Doe", "jane@example.com | +1 555 0100", "Curriculum Vitae", "PROFESSIONAL SUMMARY",
+                "Full-stack engineer with a decade of product experience."]
+    sections.append("EXPERIENCE")
+    for i in range(roles):
+        sections += [f"Senior Engineer, Company {i} (01/20{i % 20:02d} - 12/20{i % 20:02d})",
+                     f"Led migration of service {i} to Kubernetes, cutting costs by {i % 30}%.",
+                     "Mentored junior engineers and ran weekly design reviews.",
+                     f"Page {i + 1} of {roles}", "Jane Doe - Resume"]
+    sections.append("PROJECTS")
+    sections += [f"Project {i}: open-source tool used by {i * 100} developers." for i in range(roles)]
+    sections.append("EDUCATION")
+    sections += [f"Course {i}, Online Academy" for i in range(roles)]
+    sections += ["HOBBIES", "Chess, hiking, photography", "REFERENCES", "References available upon request"]
+    return "\n".join(sections)
+
+def bench_prompt_size(args):
+    from services import render_portfolio_prompt, build_portfolio_prompt
+    from prompt_builder import estimate_tokens
+    data = {"full_name": "Jane Doe", "about": "Engineer", "services": [{"category": "WEB DEVELOPMENT",
+            "services": ["React", "Node.js"]}], "tools": ["Docker", "Kubernetes"]}
+    for roles in (5, 40, 200):
+        resume = long_resume(roles)
+        before = estimate_tokens(render_portfolio_prompt(data, resume))
+        prompt = build_portfolio_prompt(data, resume)
+        counts = prompt.token_counts
+        print(f"{roles:>3} roles: raw prompt ~{before} tokens -> {counts['total']} "
+              f"(resume {counts['resume_original']} -> {counts['resume']}, budget {counts['budget']}, "
+              f"truncated {counts['truncated_sections'] or 'none'})")
+        assert counts["total"] < before
+
+# ---------------------------------------------------------
+# Stub Gemini REST server
+# ---------------------------------------------------------
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    response_text = json.dumps({"full_name": "Stub", "about": "Stub portfolio.", "projects": [], "experience": []})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.endswith(":countTokens"):
+            payload = {"totalTokens": 2}
+        else:
+            payload = {
+                "candidates": [{
+                    "content": {"parts": [{"text": self.response_text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0
+                }],
+                "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 10, "totalTokenCount": 20}
+            }
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def bench_llm_client(args):
+    server, endpoint = start_server(StubLLMHandler)
+    os.environ["GOOGLE_API_ENDPOINT"] = endpoint
+    os.environ["LLM_TRANSPORT"] = "rest"
+    os.environ.setdefault("GOOGLE_API_KEY", "stub-key")
+
+    from llm import initialize_llm, LLMRegistry
+    from config import Config
+
+    fresh, shared = [], []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        initialize_llm(Config.GOOGLE_API_KEY).invoke("ping")
+        fresh.append(time.perf_counter() - started)
+
+    registry = LLMRegistry()
+    registry.warm_up()
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        registry.get().invoke("ping")
+        shared.append(time.perf_counter() - started)
+
+    summarize("initialize_llm per request", fresh)
+    summarize("shared registry client", shared)
+    print(f"per-request overhead removed: {(statistics.mean(fresh) - statistics.mean(shared)) * 1000:.2f}ms")
+    server.shutdown()
+
+# ---------------------------------------------------------
+# End-to-end: app.py against local Mongo, PDF host and LLM
+# ---------------------------------------------------------
+def synthetic_portfolio(size_kb):
+    portfolio = {"full_name": "Bench User", "about": "Synthetic portfolio.", "projects": [], "experience": []}
+    while len(json.dumps(portfolio)) < size_kb * 1024:
+        index = len(portfolio["projects"])
+        portfolio["projects"].append({
+            "title": f"Project {index}",
+            "description": [f"Delivered milestone {i} of project {index} for a long-running client." for i in range(4)]
+        })
+    return json.dumps(portfolio)
+
+def seed_profiles(database, users, resume_base_url):
+    from bson import ObjectId
+    user_ids = []
+    for index in range(users):
+        user_id = ObjectId()
+        database.users_collection.insert_one({
+            "_id": user_id, "first_name": "Bench", "last_name": f"User {index}",
+            "github_profile": f"https://github.com/bench{index}", "profile_photo": None
+        })
+        database.freelancers_collection.insert_one({
+            "user_id": user_id, "name": f"Bench User {index}",
+            "work_description": "<p>Full-stack engineer building <b>web platforms</b>.</p>",
+            "portfolio_website": "", "project_links": "", "linkedIn_profile": None,
+            "skills": ["React", "Node.js", "UI/UX Design"], "tools": ["Docker", "Figma"],
+            "resume": {"url": f"{resume_base_url}/resume/{index}.pdf"}
+        })
+        user_ids.append(str(user_id))
+    return user_ids
+
+def start_stand_ins(args):
+    # Gemini stub, resume host and Mongo for the app under test. Without
+    # --mongo-uri both pymongo and motor are pointed at one shared
+    # mongomock client, so the Flask and ASGI apps see the same seed data.
+    import tempfile
+    StubLLMHandler.latency = args.llm_latency
+    StubLLMHandler.response_text = synthetic_portfolio(args.llm_kb)
+    _, llm_endpoint = start_server_process(StubLLMHandler)
+    resume = make_pdf(args.resume_pages)
+    for index in range(args.users):
+        PDFHandler.documents[f"/resume/{index}.pdf"] = resume
+    _, pdf_base_url = start_server_process(PDFHandler)
+
+    # The portfolio store would answer repeat users without generating, and
+    # the LLM token bucket would cap throughput at its rate; these
+    # benchmarks measure the generation path.
+    os.environ.update({
+        "GOOGLE_API_KEY": "stub-key", "GOOGLE_API_ENDPOINT": llm_endpoint, "LLM_TRANSPORT": "rest",
+        "RESUME_CACHE_DIR": tempfile.mkdtemp(), "PORTFOLIO_STORE": "false", "LLM_RATE_LIMIT": "0"
+    })
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        # mongomock has no explain(), so the index check is skipped
+        import mongomock
+        import pymongo
+        shared = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *a, **k: shared
+        try:
+            import mongomock_motor
+            import motor.motor_asyncio
+            motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **k: mongomock_motor.AsyncMongoMockClient(
+                mock_mongo_client=shared)
+        except ImportError:
+            pass
+        os.environ.update({"MONGO_URI": "mongodb://benchmark", "ENSURE_INDEXES": "false"})
+    return pdf_base_url
+
+def bench_e2e(args):
+    from collections import Counter, defaultdict
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+
+    pdf_base_url = start_stand_ins(args)
+    import logging
+    import app as app_module
+    from stages import add_stage_observer
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    user_ids = seed_profiles(app_module.get_db(), args.users, pdf_base_url)
+    stage_samples = defaultdict(list)
+    samples_lock = threading.Lock()
+
+    @add_stage_observer
+    def record(run):
+        with samples_lock:
+            for name, seconds in run.timings.items():
+                stage_samples[name].append(seconds)
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/generate_portfolio"
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    def call(index):
+        started = time.perf_counter()
+        response = session.post(url, json={"user_id": user_ids[index % len(user_ids)]})
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, range(min(args.concurrency, args.requests))))  # warm-up
+        with samples_lock:
+            stage_samples.clear()
+        started = time.perf_counter()
+        outcomes = list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in outcomes)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.users} users, "
+          f"llm latency {args.llm_latency}s / {len(StubLLMHandler.response_text) / 1024:.0f}KB, "
+          f"mongo {'mongomock' if not args.mongo_uri else args.mongo_uri}")
+    print(f"throughput {args.requests / elapsed:.1f} req/s, statuses {dict(statuses)}")
+    summarize("request", [seconds for _, seconds in outcomes])
+    for name in ("profile", "resume", "details", "generate"):
+        if stage_samples.get(name):
+            summarize(f"stage {name}", stage_samples[name])
+    server.shutdown()
+
+def free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def drive_async(url, user_ids, requests_total, concurrency):
+    # One event loop drives the load so the client side needs no thread per
+    # in-flight request. Returns (elapsed, [(status, seconds)], peak threads).
+    import asyncio
+    import httpx
+    peak_threads = [threading.active_count()]
+    done = threading.Event()
+
+    def sample_threads():
+        while not done.wait(0.05):
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+    async def run():
+        counter = iter(range(requests_total))
+        outcomes = []
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+            async def worker():
+                for index in counter:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(url, json={"user_id": user_ids[index % len(user_ids)]})
+                        status = response.status_code
+                    except httpx.HTTPError:
+                        status = "error"
+                    outcomes.append((status, time.perf_counter() - started))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - started, outcomes
+
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    try:
+        elapsed, outcomes = asyncio.run(run())
+    finally:
+        done.set()
+    return elapsed, outcomes, peak_threads[0]
+
+def bench_asgi(args):
+    # Flask (threaded werkzeug server, one thread per request) against the
+    # ASGI app under uvicorn, both in this process against the same stand-ins.
+    import logging
+    from collections import Counter
+    pdf_base_url = start_stand_ins(args)
+    import uvicorn
+    import app as flask_module
+    import asgi_app
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    user_ids = seed_profiles(flask_module.get_db(), args.users, pdf_base_url)
+
+    flask_server = make_server("127.0.0.1", 0, flask_module.app, threaded=True)
+    flask_server.socket.listen(4096)
+    threading.Thread(target=flask_server.serve_forever, daemon=True).start()
+    asgi_port = free_port()
+    asgi_server = uvicorn.Server(uvicorn.Config(asgi_app.app, host="127.0.0.1", port=asgi_port,
+                                                log_level="error", backlog=4096))
+    threading.Thread(target=asgi_server.run, daemon=True).start()
+    while not asgi_server.started:
+        time.sleep(0.05)
+
+    targets = (
+        ("flask", f"http://127.0.0.1:{flask_server.server_port}/generate_portfolio"),
+        ("asgi", f"http://127.0.0.1:{asgi_port}/generate_portfolio"),
+    )
+    print(f"llm latency {args.llm_latency}s, {args.users} users, resume {args.resume_pages} pages")
+    for concurrency in (args.concurrency, args.concurrency * 4, args.concurrency * 16):
+        total = max(args.requests, concurrency * 2)
+        for label, url in targets:
+            drive_async(url, user_ids, concurrency, concurrency)  # warm-up
+            elapsed, outcomes, peak_threads = drive_async(url, user_ids, total, concurrency)
+            statuses = dict(Counter(status for status, _ in outcomes))
+            print(f"c={concurrency:<4} {label:<6} {total / elapsed:7.1f} req/s  peak threads {peak_threads:<4} {statuses}")
+            summarize(f"  c={concurrency} {label}", [seconds for _, seconds in outcomes])
+
+    asgi_server.should_exit = True
+    flask_server.shutdown()
+
+def import_times(code, env):
+    # One fresh interpreter: wall time of the whole process plus the
+    # cumulative -X importtime figure (microseconds) of each top-level import.
+    # Runs from the repository so the modules resolve from any working directory.
+    import subprocess
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Nested imports are indented below the module that triggered them
+        if cumulative_us.strip().isdigit() and not name[1:].startswith(" "):
+            modules[name.strip()] = int(cumulative_us) / 1e6
+    return elapsed, modules
+
+def bench_cold_start(args):
+    # What a Lambda cold start pays before lambda_handler runs, measured in
+    # fresh interpreters: importing the handler, and importing it plus the
+    # langchain/PyPDF2 modules it only loads on first use.
+    env = {**os.environ, "MONGO_URI": os.environ.get("MONGO_URI", "mongodb://127.0.0.1:1"),
+           "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "benchmark")}
+    cases = (
+        ("interpreter", "pass"),
+        ("handler import", "import portfolio"),
+        ("handler + llm/pdf", "import portfolio, langchain_google_genai, PyPDF2"),
+    )
+    for label, code in cases:
+        import_times(code, env)  # warm the filesystem cache and .pyc files
+        walls = []
+        for _ in range(args.requests):
+            elapsed, modules = import_times(code, env)
+            walls.append(elapsed)
+        summarize(f"{label} (process)", walls)
+        heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]
+        print("  heaviest imports: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in heaviest))
+
+def bench_responses(args):
+    # /generate_portfolio response bodies: jsonify versus the utils layer
+    # (orjson, compression) and a conditional request answered with 304.
+    from flask import Flask, jsonify
+    from utils import success_response
+    app = Flask(__name__)
+    portfolio = json.loads(synthetic_portfolio(args.llm_kb))
+    with app.test_request_context():
+        etag = success_response(portfolio).headers["ETag"]
+    cases = (
+        ("jsonify", {}, lambda: jsonify(portfolio)),
+        ("utils, identity", {}, lambda: success_response(portfolio)),
+        ("utils, gzip", {"Accept-Encoding": "gzip"}, lambda: success_response(portfolio)),
+        ("utils, br", {"Accept-Encoding": "br"}, lambda: success_response(portfolio)),
+        ("utils, 304 (stored etag)", {"If-None-Match": etag}, lambda: success_response(portfolio, etag=etag)),
+    )
+    for label, headers, build in cases:
+        samples = []
+        with app.test_request_context(headers=headers):
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = build()
+                samples.append(time.perf_counter() - started)
+            size = len(response.get_data())
+        summarize(f"{label} ({response.status_code}, {size}B)", samples)
+
+BENCHMARKS = {
+    "llm_client": bench_llm_client,
+    "resume_memory": bench_resume_memory,
+    "page_extraction": bench_page_extraction,
+    "normalizer": bench_normalizer,
+    "catalog": bench_catalog,
+    "prompt_size": bench_prompt_size,
+    "e2e": bench_e2e,
+    "asgi": bench_asgi,
+    "cold_start": bench_cold_start,
+    "responses": bench_responses,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local portfolio pipeline benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--padding-kb", type=int, default=0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--resume-pages", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-kb", type=int, default=4)
+    parser.add_argument("--mongo-uri", help="seed and use a real mongod instead of mongomock")
+    args = parser.parse_args()
+    sys.exit(BENCHMARKS[args.benchmark](args))
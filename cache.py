@@ -0,0 +1,294 @@
+import os
+import json
+import hashlib
+import logging
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+from config import Config
+
+# A temp file this old was left behind by a writer that died before its rename
+STALE_TMP_SECONDS = 300
+
+_prune_lock = threading.Lock()
+_prune_state = {}
+
+def prune_cache_dir(cache_dir, max_bytes=None, ttl_seconds=None):
+    # Shared by every worker on the host, so files can vanish mid-scan.
+    # Reads refresh an entry's mtime, which makes this least recently used.
+    max_bytes = Config.RESUME_CACHE_DISK_MAX_BYTES if max_bytes is None else max_bytes
+    ttl_seconds = Config.RESUME_CACHE_DISK_TTL if ttl_seconds is None else ttl_seconds
+    now = time.time()
+    files = []
+    removed = 0
+    try:
+        entries = list(os.scandir(cache_dir))
+    except OSError as e:
+        logging.error(f"Error scanning resume cache directory {cache_dir}: {e}")
+        return 0
+    for entry in entries:
+        try:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        age = now - stat.st_mtime
+        if entry.name.endswith(".tmp"):
+            expired = age > STALE_TMP_SECONDS
+        else:
+            expired = ttl_seconds > 0 and age > ttl_seconds
+        if expired:
+            removed += _remove(entry.path)
+        elif not entry.name.endswith(".tmp"):
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in files)
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        removed += _remove(path)
+        total -= size
+    return removed
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        logging.error(f"Error pruning resume cache file {path}: {e}")
+        return 0
+
+def note_disk_write(cache_dir, size):
+    # Prunes once per RESUME_CACHE_DISK_PRUNE_INTERVAL, or sooner after a
+    # tenth of the size limit has been written, instead of on every write.
+    now = time.monotonic()
+    with _prune_lock:
+        pruned_at, written = _prune_state.get(cache_dir, (None, 0))
+        written += size
+        due = (pruned_at is None or now - pruned_at >= Config.RESUME_CACHE_DISK_PRUNE_INTERVAL
+               or written >= Config.RESUME_CACHE_DISK_MAX_BYTES // 10)
+        _prune_state[cache_dir] = (now, 0) if due else (pruned_at, written)
+    return prune_cache_dir(cache_dir) if due else 0
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+class ResumeTextCache:
+    # Two tiers: a size-bounded in-process LRU in front of a directory shared
+    # by every worker on the host. Entries are keyed by resume URL plus the
+    # SHA-256 of the downloaded PDF, so a changed resume never hits stale text.
+    def __init__(self, max_bytes=None, cache_dir=None):
+        self.max_bytes = Config.RESUME_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.cache_dir = Config.RESUME_CACHE_DIR if cache_dir is None else cache_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.seconds_saved = 0.0
+        self.seconds_spent = 0.0
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logging.error(f"Disabling resume disk cache at {self.cache_dir}: {e}")
+                self.cache_dir = None
+
+    @staticmethod
+    def make_key(url, content_hash):
+        return hashlib.sha256(f"{url}\n{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, url, content_hash):
+        key = self.make_key(url, content_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.seconds_saved += entry[2]
+                return entry[0]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.seconds_saved += entry[2]
+            self._store(key, entry)
+        return entry[0]
+
+    def put(self, url, content_hash, text, extraction_seconds=0.0):
+        key = self.make_key(url, content_hash)
+        entry = (text, len(text.encode("utf-8")), extraction_seconds)
+        with self._lock:
+            self.seconds_spent += extraction_seconds
+            self._store(key, entry)
+        self._write_disk(key, url, content_hash, entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "extraction_seconds_saved": round(self.seconds_saved, 3),
+                "extraction_seconds_spent": round(self.seconds_spent, 3)
+            }
+
+    def _store(self, key, entry):
+        # Caller holds self._lock
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= previous[1]
+        if entry[1] > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += entry[1]
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted[1]
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                record = json.load(f)
+            _touch(self._path(key))
+            text = record["text"]
+            return (text, len(text.encode("utf-8")), record.get("extraction_seconds", 0.0))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading resume cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key, url, content_hash, entry):
+        if not self.cache_dir:
+            return
+        record = {
+            "url": url,
+            "content_hash": content_hash,
+            "text": entry[0],
+            "extraction_seconds": entry[2]
+        }
+        try:
+            # Write to a sibling temp file and rename so concurrent workers
+            # never observe a partially written entry.
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+                size = f.tell()
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logging.error(f"Error writing resume cache entry {key}: {e}")
+            return
+        removed = note_disk_write(self.cache_dir, size)
+        if removed:
+            with self._lock:
+                self.disk_evictions += removed
+
+class ValidatorStore:
+    # ETag / Last-Modified per resume URL together with the content hash they
+    # validated, so a 304 can be answered straight from ResumeTextCache.
+    # Mirrored to the cache directory so every worker can revalidate.
+    def __init__(self, max_entries=None, cache_dir=None):
+        self.max_entries = Config.RESUME_VALIDATOR_MAX_ENTRIES if max_entries is None else max_entries
+        self.cache_dir = Config.RESUME_CACHE_DIR if cache_dir is None else cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logging.error(f"Disabling resume validator disk store at {self.cache_dir}: {e}")
+                self.cache_dir = None
+
+    def get(self, url):
+        with self._lock:
+            validators = self._entries.get(url)
+            if validators is not None:
+                self._entries.move_to_end(url)
+                return validators
+        validators = self._read_disk(url)
+        if validators is not None:
+            self._remember(url, validators)
+        return validators
+
+    def put(self, url, etag, last_modified, content_hash):
+        if not etag and not last_modified:
+            self.discard(url)
+            return
+        validators = {"etag": etag, "last_modified": last_modified, "content_hash": content_hash}
+        self._remember(url, validators)
+        self._write_disk(url, validators)
+
+    def discard(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(url))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"Error removing resume validators for {url}: {e}")
+
+    def _remember(self, url, validators):
+        with self._lock:
+            self._entries[url] = validators
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.validators.json")
+
+    def _read_disk(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                validators = json.load(f)
+            _touch(self._path(url))
+            return validators
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading resume validators for {url}: {e}")
+            return None
+
+    def _write_disk(self, url, validators):
+        if not self.cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(validators, f)
+                size = f.tell()
+            os.replace(tmp_path, self._path(url))
+        except Exception as e:
+            logging.error(f"Error writing resume validators for {url}: {e}")
+            return
+        note_disk_write(self.cache_dir, size)
@@ -0,0 +1,204 @@
+import re
+
+# Services Mapping and Tools List
+SERVICES_MAPPING = {
+    "GRAPHIC DESIGNING (2D/3D)": [
+        "Logos", "Business Cards", "Banners", "Brochures", "Social Media Posts",
+        "Infographics (2D/3D)", "Flvers", "Posters", "Packaging Design",
+        "Illustrations (2D/3D)", "Merch Design", "3D Modelling", "Animation (2D/3D)"
+    ],
+    "UI/UX DESIGNING": [
+        "Mobile App UI/UX", "WebApp UI/UX", "Custom Software UI/UX"
+    ],
+    "NO-CODE/LOW-CODE DEVELOPMENT": [
+        "Bubble", "Wordpress", "Webflow", "Shopify", "Framer", "Wix", "Notion",
+        "Cardd", "Softr.io", "Glide", "Outsystems", "Retool", "AppSmith"
+    ],
+    "Mobile app development": [
+        "Android", "IOS"
+    ],
+    "VIDEO EDITING (2D/3D)": [
+        "Reels/Shorts", "Youtube Videos", "Marketing Videos", "Product Demos",
+        "Wedding Documentary", "Film Editing"
+    ],
+    "DIGITAL MARKETING": [
+        "SEO", "SEM", "Social Media Marketing", "Content Marketing", "Email Marketing",
+        "Affiliate Marketing", "PPC ads", "Influencer marketing"
+    ],
+    "CONTENT WRITING": [
+        "Blogs", "Copywriting", "Technical Writing", "Ghostwriting", "SEO Writing",
+        "Product Descriptions", "Press Releases", "Academic Writing"
+    ],
+    "CUSTOM SOFTWARE DEVELOPMENT": [
+        "ERP development", "CRM development", "SaaS development", "Enterprise Software",
+        "Desktop Application", "Cloud-based Software"
+    ],
+    "AUTOMATION": [
+        "Zoho", "Hubspot", "Salesforce", "Airtable", "Zapier", "Odoo", "Looker Studio"
+    ],
+    "PHOTOGRAPHY/VIDEOGRAPHY": [
+        "Event", "Wedding", "Product", "Real Estate", "Travel",
+        "Fashion", "Food", "Corporate"
+    ],
+    "CA/LEGAL SERVICES": [
+        "Tax Consultation", "Audit Services", "Company Formation and Registration",
+        "Compliance and Regulatory Services", "Legal Documentation",
+        "Contract Drafting and Review", "Intellectual Property Services", "Legal Advisory",
+        "Corporate Law Services"
+    ],
+    "WEB DEVELOPMENT": [
+        "HTML/CSS/JavaScript", "React", "Next.js", "Vue.js", "Angular", "Node.js", "PHP",
+        "Python", "Java/.NET", "Ruby (Ruby on Rails)", "Go (Golang)", "Scala (Play Framework)",
+        "Django (Python framework)", "Spring Boot (Java framework)",
+        "MEAN Stack (MongoDB, Express.js, Angular, Node.js)",
+        "MERN Stack (MongoDB, Express.js, React, Node.js)",
+        "LAMP Stack (Linux, Apache, MySQL, PHP)",
+        "MEVN Stack (MongoDB, Express.js, Vue.js, Node.js)",
+        "Django Stack (Python, Django, PostgreSQL/MySQL)",
+        "Ruby on Rails (Ruby, PostgreSQL/MySQL, JavaScript)",
+        "PERN Stack (PostgreSQL, Express.js, React, Node.js)"
+    ]
+}
+
+TOOLS_LIST = [
+    "Adalo", "Andromo", "AppGyver", "Airtable", "ActiveCampaign", "Appian", "Appsheet",
+    "Appy Pie", "Backendless", "Betty Blocks", "Bildr", "Bizness Apps", "Boundless",
+    "Bravo Studio", "Bubble", "Bubble Pages", "BuildFire", "Carrd", "BuildBox",
+    "Builderall", "Caspio", "ClickFunnels", "Coda", "Constant Contact", "Contentful",
+    "Convertkit", "Creatio", "Draftbit", "Drapcode", "Drip", "Duda", "Elementor",
+    "Fliplet", "Flodesk", "Flutterflow", "Formbakery", "Framer", "Freshsales",
+    "GetResponse", "Glide", "Gloo", "Grapedrop", "Gravity Forms", "HubSpot",
+    "Indigo.Design", "Infusionsoft (Keap)", "Integromat (now Make)", "Jellyfish",
+    "Jotform", "Kajabi", "Kartra", "Klaviyo", "Knack", "Landbot", "Landen", "Leadpages",
+    "Mailchimp", "Makerpad", "Marketo", "Memberstack", "Mendix", "Microsoft Power Apps",
+    "Microsoft Dynamics 365", "Mobincube", "Noodl", "Morpheus", "Notion", "Odoo",
+    "Ontraport", "Outfit7", "Parabola", "Pardot", "Pega", "Pipedrive", "Pixpa",
+    "Plasmic", "Podio", "Pory", "Quickbase", "OutSystems", "Quixy", "Racket", "Retool",
+    "Salesforce", "Salesforce Lightning", "SendinBlue", "ServiceNow", "Sheet2Site",
+    "Shopify", "Shoutem", "Softr", "Squarespace", "Stacker", "Strikingly", "Substack",
+    "SugarCRM", "Swoogo", "Tapkit", "Thunkable", "Tilda", "Tonkean", "Typedream",
+    "Typeform", "Ukit", "Umso", "Unqork", "Versoly", "Voiceflow", "Weebly", "Webflow",
+    "Weweb", "Widen Collective", "Wix", "WordPress", "Xano", "Xtensio", "Zoho",
+    "Amazon Web Services (AWS)", "Apache Kafka", "Ansible", "AppDynamics",
+    "Azure DevOps", "Bamboo", "BitBucket", "Chef", "CircleCI", "Datadog", "Docker",
+    "Elasticsearch", "GitLab", "Google Cloud Platform (GCP)", "Grafana", "HashiCorp Terraform",
+    "Jenkins", "Jira", "Kubernetes", "Logstash", "Microsoft Azure", "Nagios",
+    "New Relic", "Prometheus", "Puppet", "Red Hat OpenShift", "SaltStack", "Sentry",
+    "Splunk", "TeamCity", "Travis CI", "Vagrant", "VMware vSphere", "Adobe After Effects",
+    "Adobe Animate", "Adobe Color", "Adobe Character Animator", "Adobe InDesign",
+    "Adobe Illustrator", "Adobe Photoshop", "Adobe Premiere Pro", "Adobe XD",
+    "Affinity Designer", "Apple Final Cut Pro", "Autodesk 3ds Max", "Autodesk Maya",
+    "Avid Media Composer", "Axure RP", "Balsamiq", "Blackmagic DaVinci Resolve",
+    "Blender", "Camtasia", "Canva", "Cinema 4D", "Coolors", "CorelDRAW", "Figma",
+    "Filmora", "FontForge", "Gravit Designer", "Houdini", "iMovie", "Inkscape",
+    "InVision", "Lightworks", "Marvel", "Nuke", "Mockplus", "OpenShot", "Proto.io",
+    "ProtoPie", "Sketch", "SketchUp", "Sony Vegas Pro", "Toon Boom Harmony", "UXPin",
+    "Zeplin", "ZBrush", "LAMP (Linux, Apache, MySQL, PHP)", "MEAN (MongoDB, Express.js, Angular, Node.js)",
+    "MERN (MongoDB, Express.js, React, Node.js)", "JAMstack (JavaScript, APIs, Markup)",
+    "Ruby on Rails", "Django", "ASP.NET Core", "Spring Boot", "Laravel", "Symfony",
+    "Express.js", "Vue.js", "Angular", "React", "Next.js", "Nuxt.js", "Flutter", "Ionic",
+    "React Native", "Electron", "Meteor", "Phoenix (Elixir)", "Flask", "FastAPI", "Svelte",
+    "Ember.js", "Backbone.js", "Ruby on Sinatra", "Koa.js", "Sails.js", "Grails",
+    "Play Framework", "CakePHP", "CodeIgniter", "Zend Framework", "Yii", "Nest.js",
+    "Quasar Framework", "Gatsby", "Xamarin", "Qt"
+]
+
+# Common spellings and shorthands that should resolve to a catalog entry.
+# Keys are matched after folding, so case and punctuation do not matter.
+ALIASES = {
+    "Golang": "Go (Golang)",
+    "RoR": "Ruby on Rails",
+    "ReactJS": "React",
+    "AngularJS": "Angular",
+    "iPhone": "IOS",
+    "Flyers": "Flvers",
+    "Carrd": "Cardd",
+    "Softr": "Softr.io",
+    "AWS": "Amazon Web Services (AWS)",
+    "GCP": "Google Cloud Platform (GCP)",
+    "Azure": "Microsoft Azure",
+    "K8s": "Kubernetes",
+    "Terraform": "HashiCorp Terraform",
+    "OpenShift": "Red Hat OpenShift",
+    "Photoshop": "Adobe Photoshop",
+    "Illustrator": "Adobe Illustrator",
+    "InDesign": "Adobe InDesign",
+    "Premiere Pro": "Adobe Premiere Pro",
+    "After Effects": "Adobe After Effects",
+    "Final Cut Pro": "Apple Final Cut Pro",
+    "DaVinci Resolve": "Blackmagic DaVinci Resolve",
+    "3ds Max": "Autodesk 3ds Max",
+    "Maya": "Autodesk Maya",
+    "Power Apps": "Microsoft Power Apps",
+    "Make": "Integromat (now Make)",
+    "Keap": "Infusionsoft (Keap)",
+    "Google Data Studio": "Looker Studio"
+}
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+def fold_key(value):
+    return _NON_ALNUM.sub("", value.casefold())
+
+class CatalogIndex:
+    # Built once at import: folded key -> catalog entries, so matching a
+    # profile is one dict lookup per skill instead of a scan of every
+    # category and the whole tools list.
+    def __init__(self, services_mapping, tools_list, aliases=None):
+        self.categories = list(services_mapping)
+        self._services = {}
+        self._tools = {}
+
+        canonical_entries = {}
+        for position, (category, items) in enumerate(services_mapping.items()):
+            for name in items:
+                canonical_entries.setdefault(name, []).append(("service", position, name))
+        for name in tools_list:
+            canonical_entries.setdefault(name, []).append(("tool", None, name))
+
+        for name, entries in canonical_entries.items():
+            self._add(fold_key(name), entries)
+        # "Go (Golang)" is also reachable as "Go", unless that already names
+        # another entry.
+        for name, entries in canonical_entries.items():
+            bare = name.split(" (", 1)[0]
+            if bare != name and fold_key(bare) not in self._services and fold_key(bare) not in self._tools:
+                self._add(fold_key(bare), entries)
+        for alias, target in (aliases or {}).items():
+            if target not in canonical_entries:
+                raise ValueError(f"Alias '{alias}' points at unknown catalog entry '{target}'.")
+            self._add(fold_key(alias), canonical_entries[target])
+
+    def _add(self, key, entries):
+        for kind, position, name in entries:
+            if kind == "service":
+                services = self._services.setdefault(key, [])
+                if (position, name) not in services:
+                    services.append((position, name))
+            else:
+                self._tools.setdefault(key, name)
+
+    def match(self, skills):
+        by_category = {}
+        matched_tools = []
+        seen = set()
+        for skill in skills:
+            if not isinstance(skill, str):
+                continue
+            key = fold_key(skill)
+            for position, name in self._services.get(key, ()):
+                if (position, name) not in seen:
+                    seen.add((position, name))
+                    by_category.setdefault(position, []).append(name)
+            tool = self._tools.get(key)
+            if tool is not None and tool not in seen:
+                seen.add(tool)
+                matched_tools.append(tool)
+
+        matched_services = [
+            {"category": self.categories[position], "services": by_category[position]}
+            for position in sorted(by_category)
+        ]
+        return matched_services, matched_tools
+
+catalog_index = CatalogIndex(SERVICES_MAPPING, TOOLS_LIST, ALIASES)
@@ -0,0 +1,133 @@
+import os
+import copy
+import json
+import time
+import uuid
+import socket
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from metrics import registry
+
+coalesced_total = registry.counter(
+    "portfolio_coalesced_total", "Requests served by another request's in-flight generation.", ("scope",))
+
+def profile_fingerprint(user, freelancer):
+    # Stable hash of the projected profile documents: identical requests
+    # for an unchanged profile share a key, an edit in between does not.
+    canonical = json.dumps([user, freelancer], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    # Concurrent do() calls with the same key run func once; the others
+    # block until it finishes and receive a copy of its result (or its
+    # exception). Nothing is cached once the call completes. An optional
+    # shared store extends the same guarantee across gunicorn workers.
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            coalesced_total.inc(scope="local")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self.shared.do(key, func) if self.shared else func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class MongoFlightStore:
+    # Cross-worker single flight: the worker that inserts the key's document
+    # computes, the others poll it for the result. A lease bounds how long a
+    # crashed leader can block a key; finished results stay readable for
+    # COALESCE_RESULT_TTL so a retry that arrives just after still shares it.
+    def __init__(self, collection, lease_seconds=None, result_ttl=None, poll_interval=None):
+        self.collection = collection
+        self.lease_seconds = Config.COALESCE_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.result_ttl = Config.COALESCE_RESULT_TTL if result_ttl is None else result_ttl
+        self.poll_interval = Config.COALESCE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            logging.error(f"Error creating flight indexes: {e}")
+            raise e
+
+    def do(self, key, func):
+        while True:
+            owner = f"{self.owner_prefix}:{uuid.uuid4().hex}"
+            try:
+                self.collection.insert_one({
+                    "_id": key, "status": "running", "owner": owner,
+                    "expires_at": _now() + timedelta(seconds=self.lease_seconds)
+                })
+            except DuplicateKeyError:
+                document = self._wait(key)
+                if document is None:
+                    # Leader failed or its lease ran out; try to take over
+                    continue
+                coalesced_total.inc(scope="shared")
+                return document["result"]
+
+            try:
+                result = func()
+            except Exception as e:
+                self.collection.delete_one({"_id": key, "owner": owner})
+                raise e
+            self.collection.update_one({"_id": key, "owner": owner}, {"$set": {
+                "status": "done", "result": result,
+                "expires_at": _now() + timedelta(seconds=self.result_ttl)
+            }})
+            return result
+
+    def _wait(self, key):
+        while True:
+            document = self.collection.find_one({"_id": key})
+            if document is None:
+                return None
+            if _aware(document["expires_at"]) <= _now():
+                self.collection.delete_one({"_id": key, "owner": document["owner"]})
+                return None
+            if document["status"] == "done":
+                return document
+            time.sleep(self.poll_interval)
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def _aware(value):
+    # pymongo returns naive UTC datetimes unless the client is tz_aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def create_single_flight(db):
+    if Config.COALESCE_STORE == "mongo":
+        return SingleFlight(MongoFlightStore(db.flights_collection))
+    return SingleFlight()
+
+portfolio_flights = SingleFlight()
@@ -8,6 +8,84 @@ class Config:
     MONGO_URI = os.getenv("MONGO_URI")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "ERROR")
+    PORT = int(os.getenv("PORT", "5000"))
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "32"))
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "30"))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "150"))
+    TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+    LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-pro")
+    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.5"))
+    LLM_TRANSPORT = os.getenv("LLM_TRANSPORT")
+    LLM_WARMUP = os.getenv("LLM_WARMUP", "false").lower() == "true"
+    GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
+    LLM_FIX_MODEL = os.getenv("LLM_FIX_MODEL", "gemini-1.5-flash")
+    LLM_JSON_FIX = os.getenv("LLM_JSON_FIX", "true").lower() == "true"
+    # The scheduler's concurrency cap and token bucket are per worker
+    # process: the cluster-wide LLM rate is LLM_RATE_LIMIT * WEB_WORKERS
+    # (plus any precompute workers). 0 disables the rate limit.
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))
+    LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+    LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "200"))
+    GENERATION_MODE = os.getenv("GENERATION_MODE", "single")
+    SECTION_WORKERS = int(os.getenv("SECTION_WORKERS", "16"))
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+    PROMPT_CHARS_PER_TOKEN = int(os.getenv("PROMPT_CHARS_PER_TOKEN", "4"))
+    ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "true").lower() == "true"
+    # Room for every request thread's overlapping stages plus calls that
+    # outlived their deadline and still hold a thread
+    STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", str(WEB_THREADS * 4)))
+    PROFILE_STAGE_TIMEOUT = float(os.getenv("PROFILE_STAGE_TIMEOUT", "5"))
+    RESUME_STAGE_TIMEOUT = float(os.getenv("RESUME_STAGE_TIMEOUT", "10"))
+    LLM_STAGE_TIMEOUT = float(os.getenv("LLM_STAGE_TIMEOUT", "120"))
+    JOB_STORE = os.getenv("JOB_STORE", "memory")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+    COALESCE_STORE = os.getenv("COALESCE_STORE", "memory")
+    PORTFOLIO_STORE = os.getenv("PORTFOLIO_STORE", "true").lower() == "true"
+    PRECOMPUTE_MODE = os.getenv("PRECOMPUTE_MODE", "auto")
+    PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "2"))
+    PRECOMPUTE_POLL_INTERVAL = float(os.getenv("PRECOMPUTE_POLL_INTERVAL", "30"))
+    PRECOMPUTE_UPDATED_FIELD = os.getenv("PRECOMPUTE_UPDATED_FIELD", "updated_at")
+    COALESCE_LEASE_SECONDS = int(os.getenv("COALESCE_LEASE_SECONDS", "180"))
+    COALESCE_RESULT_TTL = int(os.getenv("COALESCE_RESULT_TTL", "30"))
+    COALESCE_POLL_INTERVAL = float(os.getenv("COALESCE_POLL_INTERVAL", "0.25"))
+    BATCH_MAX_USERS = int(os.getenv("BATCH_MAX_USERS", "5000"))
+    BATCH_DOWNLOAD_CONCURRENCY = int(os.getenv("BATCH_DOWNLOAD_CONCURRENCY", "16"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+    RESUME_VALIDATOR_MAX_ENTRIES = int(os.getenv("RESUME_VALIDATOR_MAX_ENTRIES", "10000"))
+    RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(20 * 1024 * 1024)))
+    RESUME_SPOOL_THRESHOLD = int(os.getenv("RESUME_SPOOL_THRESHOLD", str(2 * 1024 * 1024)))
+    # Ceiling on the Python heap one resume download and parse may use; the
+    # in-memory spool is capped at a quarter of it.
+    RESUME_PEAK_MEMORY_BYTES = int(os.getenv("RESUME_PEAK_MEMORY_BYTES", str(8 * 1024 * 1024)))
+    RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "30"))
+    RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "60000"))
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+    PDF_POOL_START_METHOD = os.getenv("PDF_POOL_START_METHOD", "forkserver")
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+    RESUME_CACHE_MAX_BYTES = int(os.getenv("RESUME_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    RESUME_CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "/tmp/resume_text_cache")
+    # The shared directory is pruned to this size (oldest entries first) and
+    # entries untouched for RESUME_CACHE_DISK_TTL seconds are dropped (0 keeps them).
+    RESUME_CACHE_DISK_MAX_BYTES = int(os.getenv("RESUME_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+    RESUME_CACHE_DISK_TTL = int(os.getenv("RESUME_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+    RESUME_CACHE_DISK_PRUNE_INTERVAL = float(os.getenv("RESUME_CACHE_DISK_PRUNE_INTERVAL", "60"))
     # Add other configurations as needed
 
     @staticmethod
@@ -1,8 +1,53 @@
 from pymongo import MongoClient
 from bson import ObjectId
 from config import Config
+from metrics import span, timed
 import logging
 
+# Only the fields the portfolio pipeline reads
+USER_PROFILE_FIELDS = ["first_name", "last_name", "github_profile", "profile_photo"]
+FREELANCER_PROFILE_FIELDS = [
+    "user_id", "name", "work_description", "portfolio_website", "project_links",
+    "linkedIn_profile", "skills", "tools", "profile_photo", "resume.url"
+]
+USER_PROFILE_PROJECTION = {field: 1 for field in USER_PROFILE_FIELDS}
+FREELANCER_PROFILE_PROJECTION = {field: 1 for field in FREELANCER_PROFILE_FIELDS}
+
+def _find_stages(plan, stages=None):
+    stages = [] if stages is None else stages
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            _find_stages(value, stages)
+    elif isinstance(plan, list):
+        for value in plan:
+            _find_stages(value, stages)
+    return stages
+
+def profile_pipeline(user_id, freelancers_collection_name):
+    # The user document joined with its freelancer document, both projected
+    # down to the fields the pipeline uses.
+    return [
+        {"$match": {"_id": ObjectId(user_id)}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": freelancers_collection_name,
+            "localField": "_id",
+            "foreignField": "user_id",
+            "as": "freelancer"
+        }},
+        {"$project": dict(
+            USER_PROFILE_PROJECTION,
+            **{f"freelancer.{field}": 1 for field in FREELANCER_PROFILE_FIELDS}
+        )}
+    ]
+
+def split_profile(documents):
+    user = documents[0]
+    freelancers = user.pop("freelancer", [])
+    return user, (freelancers[0] if freelancers else None)
+
 class Database:
     def __init__(self):
         try:
@@ -10,6 +55,9 @@ class Database:
             self.db = self.client["stackwalls"]
             self.freelancers_collection = self.db["freelancers"]
             self.users_collection = self.db["users"]
+            self.jobs_collection = self.db["portfolio_jobs"]
+            self.flights_collection = self.db["portfolio_flights"]
+            self.portfolios_collection = self.db["portfolios"]
             logging.info("Connected to MongoDB successfully.")
         except Exception as e:
             logging.error(f"Failed to connect to MongoDB: {e}")
@@ -29,6 +77,103 @@ class Database:
             logging.error(f"Error fetching user: {e}")
             raise e
 
+    @timed("mongo.get_profile")
+    def get_profile(self, user_id):
+        # One round trip for both documents
+        try:
+            pipeline = profile_pipeline(user_id, self.freelancers_collection.name)
+            documents = list(self.users_collection.aggregate(pipeline))
+            if not documents:
+                # Freelancer profiles can exist without a user document
+                freelancer = self.freelancers_collection.find_one(
+                    {"user_id": ObjectId(user_id)}, FREELANCER_PROFILE_PROJECTION
+                )
+                return None, freelancer
+            return split_profile(documents)
+        except Exception as e:
+            logging.error(f"Error fetching profile: {e}")
+            raise e
+
+    def ensure_indexes(self):
+        try:
+            self.freelancers_collection.create_index("user_id")
+            self.check_query_plans()
+        except Exception as e:
+            logging.error(f"Error ensuring indexes: {e}")
+            raise e
+
+    def check_query_plans(self):
+        # Fails loudly instead of silently serving every profile lookup with
+        # a collection scan once the freelancers collection grows.
+        plan = self.freelancers_collection.find({"user_id": ObjectId()}).explain()
+        stages = _find_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            raise RuntimeError("freelancers.user_id lookups fall back to a collection scan; index is missing.")
+
+    @timed("mongo.get_freelancers")
+    def get_freelancers(self, user_ids):
+        try:
+            freelancers = {}
+            cursor = self.freelancers_collection.find(
+                {"user_id": {"$in": [ObjectId(u) for u in user_ids]}}, FREELANCER_PROFILE_PROJECTION
+            )
+            for freelancer in cursor:
+                freelancers.setdefault(str(freelancer["user_id"]), freelancer)
+            return freelancers
+        except Exception as e:
+            logging.error(f"Error fetching freelancers: {e}")
+            raise e
+
+    @timed("mongo.get_users")
+    def get_users(self, user_ids):
+        try:
+            cursor = self.users_collection.find(
+                {"_id": {"$in": [ObjectId(u) for u in user_ids]}}, USER_PROFILE_PROJECTION
+            )
+            return {str(user["_id"]): user for user in cursor}
+        except Exception as e:
+            logging.error(f"Error fetching users: {e}")
+            raise e
+
+    def ping(self):
+        return self.client.admin.command("ping")
+
+    def close(self):
+        self.client.close()
+        logging.info("MongoDB connection closed.")
+
+class AsyncDatabase:
+    # motor counterpart of Database for the ASGI serving mode. motor is
+    # imported here so the Flask and CLI paths never load it.
+    def __init__(self, client=None):
+        try:
+            if client is None:
+                from motor.motor_asyncio import AsyncIOMotorClient
+                client = AsyncIOMotorClient(Config.MONGO_URI)
+            self.client = client
+            self.db = self.client["stackwalls"]
+            self.freelancers_collection = self.db["freelancers"]
+            self.users_collection = self.db["users"]
+            logging.info("Connected to MongoDB (async) successfully.")
+        except Exception as e:
+            logging.error(f"Failed to connect to MongoDB: {e}")
+            raise e
+
+    async def get_profile(self, user_id):
+        with span("mongo.get_profile"):
+            try:
+                pipeline = profile_pipeline(user_id, self.freelancers_collection.name)
+                documents = await self.users_collection.aggregate(pipeline).to_list(length=1)
+                if not documents:
+                    freelancer = await self.freelancers_collection.find_one(
+                        {"user_id": ObjectId(user_id)}, FREELANCER_PROFILE_PROJECTION
+                    )
+                    return None, freelancer
+                return split_profile(documents)
+            except Exception as e:
+                logging.error(f"Error fetching profile: {e}")
+                raise e
+
     def close(self):
         self.client.close()
-        logging.info("MongoDB connection closed.")
\ No newline at end of file
+        logging.info("MongoDB connection closed.")
@@ -0,0 +1,70 @@
+# gunicorn.conf.py
+# Production entry point: gunicorn --config gunicorn.conf.py app:app
+import os
+import importlib
+import tempfile
+from config import Config
+
+bind = f"0.0.0.0:{Config.PORT}"
+worker_class = "gthread"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+
+# Job status is read back by a later request that may land on any worker,
+# so in-memory job stores only work with a single worker.
+if workers > 1:
+    if "JOB_STORE" not in os.environ:
+        Config.JOB_STORE = "mongo"
+    elif Config.JOB_STORE != "mongo":
+        raise RuntimeError(f"JOB_STORE={Config.JOB_STORE} cannot serve {workers} workers; use JOB_STORE=mongo.")
+    # /metrics is answered by one worker but reports all of them
+    if not Config.METRICS_DIR:
+        Config.METRICS_DIR = tempfile.mkdtemp(prefix="portfolio-metrics-")
+
+# Import app.py (catalogs, prompt templates) once in the master so workers
+# share those pages copy-on-write.
+preload_app = True
+
+timeout = Config.WEB_TIMEOUT
+# Long enough for an in-flight generation to finish after SIGTERM
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+loglevel = Config.LOG_LEVEL.lower()
+
+def on_starting(server):
+    # llm.py and pdf_extraction.py import these lazily to keep cold starts
+    # short; the web master loads them up front so workers share them too.
+    for module in ("langchain_google_genai", "PyPDF2"):
+        importlib.import_module(module)
+    # Snapshots left by a previous run would be summed into this one
+    if Config.METRICS_DIR:
+        for name in os.listdir(Config.METRICS_DIR):
+            if name.endswith((".json", ".tmp")):
+                os.remove(os.path.join(Config.METRICS_DIR, name))
+
+def post_fork(server, worker):
+    import app
+    app.reset_forked_state()
+    app.init_worker()
+    server.log.info(f"Worker {worker.pid} initialised MongoDB and LLM clients.")
+
+def post_worker_init(worker):
+    # worker_exit only runs once the worker has stopped accepting and
+    # finished its requests; readiness has to flip as soon as SIGTERM
+    # arrives so load balancers stop routing here during the drain.
+    import signal
+    import app
+    handle_exit = worker.handle_exit
+
+    def handle_term(sig, frame):
+        app.draining.set()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+    signal.siginterrupt(signal.SIGTERM, False)
+
+def worker_exit(server, worker):
+    import app
+    app.drain()
@@ -0,0 +1,76 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+_session = None
+_session_lock = threading.Lock()
+
+def build_session():
+    retry = Retry(
+        total=Config.HTTP_RETRIES,
+        connect=Config.HTTP_RETRIES,
+        read=Config.HTTP_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session():
+    # requests.Session is safe to share for plain GETs; the adapter's
+    # connection pool is what lets repeat downloads skip TCP and TLS setup.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            try:
+                _session.close()
+            except Exception as e:
+                logging.error(f"Error closing HTTP session: {e}")
+        _session = None
+
+def request_timeout():
+    return (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+def conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def build_async_client():
+    # httpx client for the ASGI serving mode; imported lazily so the sync
+    # paths never load it. Like the requests adapter, keep-alive is capped
+    # but the number of open connections is not.
+    import httpx
+    transport = httpx.AsyncHTTPTransport(
+        retries=Config.HTTP_RETRIES,
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=Config.HTTP_POOL_MAXSIZE)
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT),
+        follow_redirects=True
+    )
@@ -0,0 +1,238 @@
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from pipeline import UserNotFoundError
+from output_parser import PortfolioParseError
+from stages import StageTimeoutError
+from llm import LLMOverloadedError
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _aware(value):
+    # pymongo returns naive UTC datetimes unless the client is tz_aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def new_job(user_id):
+    timestamp = _now()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "status": "queued",
+        "result": None,
+        "error": None,
+        "error_status": None,
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+
+class InMemoryJobStore:
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = Config.JOB_RESULT_TTL if ttl_seconds is None else ttl_seconds
+        self._jobs = {}
+        self._active = {}
+        self._finished_at = {}
+        self._lock = threading.Lock()
+
+    def create_or_get_active(self, job):
+        with self._lock:
+            self._prune()
+            active_id = self._active.get(job["user_id"])
+            if active_id is not None:
+                return dict(self._jobs[active_id]), False
+            self._jobs[job["job_id"]] = dict(job)
+            self._active[job["user_id"]] = job["job_id"]
+            return dict(job), True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields, updated_at=_now())
+            if job["status"] not in ACTIVE_STATUSES:
+                if self._active.get(job["user_id"]) == job_id:
+                    del self._active[job["user_id"]]
+                self._finished_at[job_id] = time.monotonic()
+
+    def renew(self, job_ids):
+        # Jobs live and die with this process; there is nothing to lease
+        pass
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [job_id for job_id, finished in self._finished_at.items() if finished < cutoff]
+        for job_id in expired:
+            del self._finished_at[job_id]
+            self._jobs.pop(job_id, None)
+
+class MongoJobStore:
+    # 'active_user_id' is only set while a job is queued or running; the
+    # unique sparse index on it makes duplicate submissions for the same user
+    # collide atomically, even across workers. Active jobs hold a lease the
+    # owning worker keeps renewing; a job whose lease ran out belonged to a
+    # worker that died (SIGKILL, OOM) and is failed so the user can resubmit.
+    def __init__(self, collection, ttl_seconds=None, lease_seconds=None):
+        self.collection = collection
+        self.ttl_seconds = Config.JOB_RESULT_TTL if ttl_seconds is None else ttl_seconds
+        self.lease_seconds = Config.JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.collection.create_index("active_user_id", unique=True, sparse=True)
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def _lease(self):
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    def create_or_get_active(self, job):
+        document = dict(job, _id=job["job_id"], active_user_id=job["user_id"], lease_expires_at=self._lease())
+        try:
+            self.collection.insert_one(document)
+            return dict(job), True
+        except DuplicateKeyError:
+            existing = self.collection.find_one({"active_user_id": job["user_id"]})
+            if existing is None or self._expire_if_abandoned(existing):
+                # The active job finished, or was abandoned, since the insert
+                return self.create_or_get_active(job)
+            return self._to_job(existing), False
+
+    def get(self, job_id):
+        document = self.collection.find_one({"_id": job_id})
+        if document and self._expire_if_abandoned(document):
+            document = self.collection.find_one({"_id": job_id})
+        return self._to_job(document) if document else None
+
+    def renew(self, job_ids):
+        if job_ids:
+            self.collection.update_many(
+                {"_id": {"$in": list(job_ids)}, "active_user_id": {"$exists": True}},
+                {"$set": {"lease_expires_at": self._lease()}}
+            )
+
+    def _expire_if_abandoned(self, document):
+        # Fails an active job whose lease ran out. The lease is part of the
+        # filter, so a renewal that lands first keeps the job alive.
+        lease = document.get("lease_expires_at")
+        if "active_user_id" not in document or (lease is not None and _aware(lease) > datetime.now(timezone.utc)):
+            return False
+        result = self.collection.update_one(
+            {"_id": document["_id"], "active_user_id": {"$exists": True}, "lease_expires_at": lease},
+            {"$set": {"status": "failed", "error": "The worker running this job stopped; resubmit the job.",
+                      "error_status": 503, "updated_at": _now(),
+                      "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)},
+             "$unset": {"active_user_id": "", "lease_expires_at": ""}}
+        )
+        return result.modified_count == 1
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = _now()
+        update = {"$set": fields}
+        if "status" in fields and fields["status"] not in ACTIVE_STATUSES:
+            fields["expires_at"] = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+            update["$unset"] = {"active_user_id": "", "lease_expires_at": ""}
+        self.collection.update_one({"_id": job_id}, update)
+
+    @staticmethod
+    def _to_job(document):
+        document = dict(document)
+        for field in ("_id", "active_user_id", "expires_at", "lease_expires_at"):
+            document.pop(field, None)
+        return document
+
+class JobManager:
+    def __init__(self, store, runner, max_workers=None, max_pending=None):
+        self.store = store
+        self.runner = runner
+        self.max_pending = Config.JOB_QUEUE_SIZE if max_pending is None else max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.JOB_WORKERS,
+            thread_name_prefix="portfolio-job"
+        )
+        self._pending = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="portfolio-job-lease", daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, user_id):
+        with self._lock:
+            job, created = self.store.create_or_get_active(new_job(user_id))
+            if not created:
+                return job, False
+            if self._pending >= self.max_pending:
+                self.store.update(job["job_id"], status="failed", error="Job queue is full.", error_status=503)
+                raise JobQueueFullError("Job queue is full.")
+            self._pending += 1
+            self._futures[job["job_id"]] = self._executor.submit(self._run, job["job_id"], user_id)
+        return job, True
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        if cancel_pending:
+            with self._lock:
+                queued = list(self._futures.items())
+            for job_id, future in queued:
+                if future.cancel():
+                    self.store.update(job_id, status="failed", error="Server is shutting down; resubmit the job.",
+                                      error_status=503)
+        self._executor.shutdown(wait=wait)
+        self._stopped.set()
+
+    def _renew_leases(self):
+        # Renews the leases of this process's queued and running jobs well
+        # before they run out
+        interval = max(1, Config.JOB_LEASE_SECONDS / 3)
+        while not self._stopped.wait(interval):
+            with self._lock:
+                job_ids = list(self._futures)
+            try:
+                self.store.renew(job_ids)
+            except Exception as e:
+                logging.error(f"Error renewing job leases: {e}")
+
+    def _run(self, job_id, user_id):
+        try:
+            self.store.update(job_id, status="running")
+            result = self.runner(user_id)
+            self.store.update(job_id, status="succeeded", result=result)
+        except UserNotFoundError as nf:
+            self.store.update(job_id, status="failed", error=str(nf), error_status=404)
+        except StageTimeoutError as te:
+            logging.error(f"Timeout in job {job_id}: {te}")
+            self.store.update(job_id, status="failed", error="Portfolio generation timed out.", error_status=504)
+        except PortfolioParseError as pe:
+            self.store.update(job_id, status="failed", error=str(pe), error_status=502)
+        except LLMOverloadedError as oe:
+            self.store.update(job_id, status="failed", error=str(oe), error_status=429)
+        except ValueError as ve:
+            logging.error(f"ValueError in job {job_id}: {ve}")
+            self.store.update(job_id, status="failed", error=str(ve), error_status=400)
+        except Exception as e:
+            logging.error(f"Unhandled exception in job {job_id}: {e}", exc_info=True)
+            self.store.update(job_id, status="failed", error="Internal Server Error.", error_status=500)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._futures.pop(job_id, None)
+
+def create_job_store(db):
+    if Config.JOB_STORE == "mongo":
+        return MongoJobStore(db.jobs_collection)
+    return InMemoryJobStore()
@@ -0,0 +1,249 @@
+import math
+import asyncio
+import time
+import heapq
+import logging
+import threading
+import itertools
+import contextvars
+from contextlib import contextmanager
+from config import Config
+from metrics import registry, snapshot_lines
+
+def initialize_llm(api_key, model=None, temperature=None):
+    # langchain is most of this service's import time; it is loaded with the
+    # first client, not with the module.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    try:
+        options = {}
+        if Config.LLM_TRANSPORT:
+            options["transport"] = Config.LLM_TRANSPORT
+        if Config.GOOGLE_API_ENDPOINT:
+            options["client_options"] = {"api_endpoint": Config.GOOGLE_API_ENDPOINT}
+        return ChatGoogleGenerativeAI(
+            model=model or Config.LLM_MODEL,
+            verbose=False,
+            temperature=Config.LLM_TEMPERATURE if temperature is None else temperature,
+            google_api_key=api_key,
+            **options
+        )
+    except Exception as e:
+        logging.error(f"Error initializing LLM: {e}")
+        raise e
+
+class LLMRegistry:
+    # One client per (model, temperature) for the whole process. The client
+    # owns its transport, so sharing it keeps the underlying HTTP/gRPC
+    # connections open between requests. Client calls are thread-safe; only
+    # construction needs the lock.
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, model=None, temperature=None):
+        model = model or Config.LLM_MODEL
+        temperature = Config.LLM_TEMPERATURE if temperature is None else temperature
+        key = (model, temperature)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = initialize_llm(self.api_key or Config.GOOGLE_API_KEY, model, temperature)
+                    self._clients[key] = client
+        return client
+
+    def warm_up(self, model=None, temperature=None):
+        # Token counting is a cheap round trip that opens the connection
+        # without paying for a generation.
+        try:
+            self.get(model, temperature).get_num_tokens("warm-up")
+            logging.info("LLM client warmed up.")
+        except Exception as e:
+            logging.error(f"LLM warm-up failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+llm_registry = LLMRegistry()
+
+def get_llm(model=None, temperature=None):
+    return llm_registry.get(model, temperature)
+
+# ---------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------
+# Lower runs first. Requests inherit the priority of the context they run
+# in, so stage and section threads keep their caller's.
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BATCH: "batch"}
+
+_current_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+llm_queue_wait_seconds = registry.histogram(
+    "portfolio_llm_queue_wait_seconds", "Time LLM calls waited for admission.", ("priority",))
+llm_shed_total = registry.counter(
+    "portfolio_llm_shed_total", "LLM calls rejected by admission control.", ("priority", "reason"))
+
+class LLMOverloadedError(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@contextmanager
+def llm_priority(priority):
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+class LLMScheduler:
+    # Admits LLM calls in priority order (FIFO within a priority) while
+    # fewer than 'max_concurrency' are running and the token bucket has a
+    # token; 'rate' tokens are added per second up to 'burst'. A call that
+    # cannot be admitted within 'max_wait', or arrives to a full queue, is
+    # rejected with LLMOverloadedError instead of tying up a worker. Each
+    # process has its own scheduler, so the limits apply per worker.
+    def __init__(self, max_concurrency=None, rate=None, burst=None, max_wait=None, max_queue=None):
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        self.rate = Config.LLM_RATE_LIMIT if rate is None else rate
+        self.burst = burst or Config.LLM_RATE_BURST
+        self.max_wait = Config.LLM_QUEUE_TIMEOUT if max_wait is None else max_wait
+        self.max_queue = max_queue or Config.LLM_QUEUE_SIZE
+        self.running = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        # entry -> (loop, asyncio.Event) for callers of acquire_async
+        self._async_waiters = {}
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        else:
+            self._tokens = float(self.burst)
+        self._refilled = now
+
+    def retry_after(self):
+        # Seconds until the current queue has likely drained, at least one
+        backlog = len(self._queue) + 1
+        seconds = backlog / self.rate if self.rate > 0 else self.max_wait
+        return max(1, math.ceil(seconds))
+
+    def _enqueue(self, priority):
+        # Caller holds the lock
+        if len(self._queue) >= self.max_queue:
+            llm_shed_total.inc(priority=PRIORITY_NAMES.get(priority, priority), reason="queue_full")
+            raise LLMOverloadedError("Too many portfolio generations are queued.", self.retry_after())
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def _admit(self, entry, deadline):
+        # Caller holds the lock. Returns None once 'entry' is admitted,
+        # otherwise how long to wait before checking again.
+        now = time.monotonic()
+        self._refill(now)
+        if self._queue[0] == entry and self.running < self.max_concurrency and self._tokens >= 1:
+            heapq.heappop(self._queue)
+            self.running += 1
+            self._tokens -= 1
+            # The next caller in line may be admissible too
+            self._wake()
+            return None
+        remaining = deadline - now
+        if remaining <= 0:
+            llm_shed_total.inc(priority=PRIORITY_NAMES.get(entry[0], entry[0]), reason="timeout")
+            raise LLMOverloadedError("Portfolio generation is at capacity.", self.retry_after())
+        if self._tokens < 1 and self.rate > 0:
+            remaining = min(remaining, (1 - self._tokens) / self.rate)
+        return remaining
+
+    def _abandon(self, entry):
+        # Caller holds the lock
+        self._async_waiters.pop(entry, None)
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._wake()
+
+    def _wake(self):
+        # Caller holds the lock; wakes blocked threads and event loops alike
+        self._condition.notify_all()
+        for loop, event in self._async_waiters.values():
+            loop.call_soon_threadsafe(event.set)
+
+    def acquire(self, priority=None):
+        priority = _current_priority.get() if priority is None else priority
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        with self._condition:
+            entry = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._admit(entry, deadline)
+                    if wait is None:
+                        break
+                    self._condition.wait(wait)
+            except BaseException:
+                self._abandon(entry)
+                raise
+        llm_queue_wait_seconds.observe(time.monotonic() - started, priority=PRIORITY_NAMES.get(priority, priority))
+
+    async def acquire_async(self, priority=None):
+        # Same admission as acquire() without parking a thread: the caller
+        # waits on an asyncio.Event that every release sets. Cancelling the
+        # caller while it waits removes it from the queue.
+        priority = _current_priority.get() if priority is None else priority
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        event = asyncio.Event()
+        with self._condition:
+            entry = self._enqueue(priority)
+            self._async_waiters[entry] = (asyncio.get_running_loop(), event)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._admit(entry, deadline)
+                    if wait is None:
+                        self._async_waiters.pop(entry, None)
+                        break
+                    event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._condition:
+                self._abandon(entry)
+            raise
+        llm_queue_wait_seconds.observe(time.monotonic() - started, priority=PRIORITY_NAMES.get(priority, priority))
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._wake()
+
+    @contextmanager
+    def slot(self, priority=None):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self):
+        with self._condition:
+            return {"queued": len(self._queue), "running": self.running}
+
+llm_scheduler = LLMScheduler()
+registry.add_collector(lambda: snapshot_lines(
+    "portfolio_llm_scheduler", "LLM calls waiting for admission and running.", "gauge",
+    llm_scheduler.snapshot(), "state"))
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from functools import wraps
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cache hit to a slow LLM generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+    def render(self, samples=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        values = sorted((self.samples() if samples is None else samples).items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            return {key: [list(series[0]), series[1], series[2]] for key, series in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return value
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def render(self, samples=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        values = sorted((self.samples() if samples is None else samples).items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self.multiprocess_dir = None
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        # 'collector' returns text-format lines for values that live
+        # elsewhere (cache stats, parser outcomes) and are read on scrape.
+        self.collectors.append(collector)
+        return collector
+
+    def collect(self):
+        lines = []
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        return lines
+
+    def render(self):
+        if self.multiprocess_dir is not None:
+            return self.render_multiprocess()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        lines.extend(self.collect())
+        return "\n".join(lines) + "\n"
+
+    # ---------------------------------------------------------
+    # gunicorn: one exposition for all workers
+    # ---------------------------------------------------------
+    # Each worker writes its samples to <directory>/<pid>.json every
+    # 'interval' seconds (and on every scrape it answers). A scrape sums
+    # counters and histograms over every file, including those of workers
+    # that have exited, so totals never go backwards. Collector values are
+    # point-in-time, so they are reported per live worker with a 'worker'
+    # label instead of being summed.
+    def enable_multiprocess(self, directory, interval=5):
+        self.multiprocess_dir = directory
+        self.flush()
+        thread = threading.Thread(target=self._flush_forever, args=(interval,), name="metrics-flush", daemon=True)
+        thread.start()
+
+    def _flush_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+    def flush(self):
+        snapshot = {
+            "metrics": {metric.name: [[list(key), value] for key, value in metric.samples().items()]
+                        for metric in self.metrics},
+            "collected": self.collect()
+        }
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logging.error(f"Error writing metrics snapshot: {e}")
+
+    def render_multiprocess(self):
+        self.flush()
+        snapshots = {}
+        for name in os.listdir(self.multiprocess_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.multiprocess_dir, name), encoding="utf-8") as f:
+                    snapshots[int(name[:-5])] = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error reading metrics snapshot {name}: {e}")
+
+        lines = []
+        for metric in self.metrics:
+            merged = {}
+            for snapshot in snapshots.values():
+                for key, value in snapshot["metrics"].get(metric.name, []):
+                    key = tuple(key)
+                    merged[key] = metric.merge(merged.get(key), value)
+            lines.extend(metric.render(merged))
+
+        headers = []
+        samples = {}
+        for pid, snapshot in sorted(snapshots.items()):
+            if not _process_alive(pid):
+                continue
+            for line in snapshot["collected"]:
+                if line.startswith("#"):
+                    if line not in headers:
+                        headers.append(line)
+                    continue
+                name = line.split("{", 1)[0].split(" ", 1)[0]
+                samples.setdefault(name, []).append(_with_worker_label(line, name, pid))
+        for header in headers:
+            lines.append(header)
+            name = header.split(" ")[2]
+            if header.startswith("# TYPE"):
+                lines.extend(samples.pop(name, []))
+        return "\n".join(lines) + "\n"
+
+def _with_worker_label(line, name, pid):
+    rest = line[len(name):]
+    if rest.startswith("{"):
+        return f'{name}{{worker="{pid}",{rest[1:]}'
+    return f'{name}{{worker="{pid}"}}{rest}'
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "portfolio_http_request_seconds", "HTTP request latency.", ("route", "method", "status"))
+stage_seconds = registry.histogram(
+    "portfolio_stage_seconds", "Pipeline stage latency.", ("stage",))
+stage_degraded_total = registry.counter(
+    "portfolio_stage_degraded_total", "Stages that resolved to their fallback value.", ("stage",))
+span_seconds = registry.histogram(
+    "portfolio_span_seconds", "Latency of instrumented operations.", ("span",))
+errors_total = registry.counter(
+    "portfolio_errors_total", "Exceptions raised inside instrumented operations.", ("span", "error"))
+llm_tokens_total = registry.counter(
+    "portfolio_llm_tokens_total", "LLM tokens reported by the provider.", ("model", "direction"))
+# Incremented by precompute.py; registered here so the web workers'
+# /metrics can render the snapshots that process writes to METRICS_DIR.
+precompute_total = registry.counter(
+    "portfolio_precompute_total", "Precompute refreshes by outcome.", ("outcome",))
+
+# ---------------------------------------------------------
+# Spans and request traces
+# ---------------------------------------------------------
+# The active request trace, or None when tracing is off. Stage threads run
+# in a copy of the request context, so their spans land on the same trace.
+_current_trace = contextvars.ContextVar("portfolio_trace", default=None)
+trace_logger = logging.getLogger("portfolio.trace")
+trace_logger.setLevel(logging.INFO)
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        errors_total.inc(span=name, error=type(e).__name__)
+        _record_span(name, started, type(e).__name__)
+        raise
+    _record_span(name, started, None)
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _record_span(name, started, error):
+    elapsed = time.perf_counter() - started
+    span_seconds.observe(elapsed, span=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        entry = {"span": name, "ms": round(elapsed * 1000, 2)}
+        if error:
+            entry["error"] = error
+        trace["spans"].append(entry)
+
+def start_trace(**fields):
+    trace = {"trace_id": uuid.uuid4().hex, **fields, "spans": []}
+    return trace, _current_trace.set(trace)
+
+def finish_trace(token, **fields):
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is not None:
+        trace.update(fields)
+        trace_logger.info(json.dumps(trace, default=str))
+
+def snapshot_lines(name, documentation, kind, values, label):
+    # Renders a {key: number} snapshot as one labelled series per key
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for key, value in sorted(values.items()):
+        if isinstance(value, (int, float)):
+            lines.append(f"{name}{_format_labels((label,), (key,))} {_format_value(value)}")
+    return lines
+
+def record_llm_usage(model, message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        llm_tokens_total.inc(usage["input_tokens"], model=model, direction="input")
+    if usage.get("output_tokens"):
+        llm_tokens_total.inc(usage["output_tokens"], model=model, direction="output")
+
+def record_stage_run(run):
+    for name, seconds in run.timings.items():
+        stage_seconds.observe(seconds, stage=name)
+    for name in run.degraded:
+        stage_degraded_total.inc(stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.setdefault("stages", {}).update(
+            {name: round(seconds * 1000, 2) for name, seconds in run.timings.items()})
@@ -0,0 +1,49 @@
+import re
+
+_LINE_BREAKS = re.compile(r"[\r\n]+")
+_BLANKS = re.compile(r"[ \t]+")
+
+def merge_spaced_letters(line):
+    # "J o h n  D o e" style lines come out of PDFs with letter-spaced
+    # headings. When most tokens are single characters, runs of them are
+    # glued back into words; other tokens are kept as they are.
+    if " " not in line:
+        return line
+    parts = line.split(" ")
+    single_chars = 0
+    for part in parts:
+        if len(part) == 1 and not part.isspace():
+            single_chars += 1
+    if single_chars * 2 <= len(parts):
+        return line
+
+    words = []
+    run = []
+    for token in parts:
+        if len(token) == 1:
+            run.append(token)
+        else:
+            if run:
+                words.append("".join(run))
+                run = []
+            words.append(token)
+    if run:
+        words.append("".join(run))
+    return " ".join(words)
+
+def iter_normalized_lines(pages):
+    # One pass over the page generator: pages are never joined into a single
+    # string, and each line is collapsed, merged and stripped as it is seen.
+    # Page boundaries always end a line, so lines never span pages.
+    for page_text in pages:
+        if not page_text:
+            continue
+        for line in _LINE_BREAKS.split(page_text):
+            if "\t" in line or "  " in line:
+                line = _BLANKS.sub(" ", line)
+            line = merge_spaced_letters(line).strip()
+            if line:
+                yield line
+
+def normalize_resume_text(pages):
+    return "\n".join(iter_normalized_lines(pages))
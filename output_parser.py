@@ -0,0 +1,191 @@
+import re
+import json
+import logging
+import threading
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*([\s\S]*?)(?:```|$)")
+# In an object, a string right after '{' or ',' is a key; if output ends
+# there (optionally after its ':') the value never arrived.
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+_TRAILING_COMMA = re.compile(r',\s*$')
+
+class PortfolioParseError(ValueError):
+    pass
+
+class ParseStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"clean": 0, "repaired": 0, "fix_calls": 0, "failed": 0}
+
+    def increment(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+parse_stats = ParseStats()
+
+def extract_json_candidate(text):
+    # Prefer the body of a ```json fence; otherwise take everything from the
+    # first '{' to the last '}' (or to the end if the output was cut off).
+    text = text.strip()
+    for match in _FENCE.finditer(text):
+        if "{" in match.group(1):
+            text = match.group(1)
+            break
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else text[start:]
+
+def _next_significant(text, index):
+    while index < len(text) and text[index] in " \t\r\n":
+        index += 1
+    return text[index] if index < len(text) else ""
+
+def repair_json(text):
+    # Fixes the defects models commonly produce: trailing commas, raw
+    # newlines and unescaped quotes inside strings, mismatched closers and
+    # output truncated mid-string or mid-array.
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+                out.append(char)
+            elif char == "\\":
+                escape = True
+                out.append(char)
+            elif char == '"':
+                # A quote only closes the string if JSON structure follows it
+                if _next_significant(text, index + 1) in (",", ":", "}", "]", ""):
+                    in_string = False
+                    out.append(char)
+                else:
+                    out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+        elif char in "}]":
+            if not stack:
+                continue
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            out.append("}" if stack.pop() == "{" else "]")
+        else:
+            out.append(char)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+
+    # Drop a key or separator left dangling by truncation before closing
+    if stack and stack[-1] == "{":
+        repaired = _DANGLING_KEY.sub(lambda m: "{" if m.group(1) == "{" else "", repaired)
+    repaired = _TRAILING_COMMA.sub("", repaired)
+    for opener in reversed(stack):
+        repaired += "}" if opener == "{" else "]"
+    return repaired
+
+def _require_list_of_dicts(document, field, problems):
+    value = document.get(field)
+    if value is None:
+        document[field] = []
+        return
+    if not isinstance(value, list):
+        problems.append(f"'{field}' must be an array")
+        return
+    for index, item in enumerate(value):
+        if not isinstance(item, dict) or not isinstance(item.get("title"), str):
+            problems.append(f"'{field}[{index}]' must be an object with a title")
+            continue
+        description = item.get("description")
+        if isinstance(description, str):
+            item["description"] = [description]
+        elif description is not None and not isinstance(description, list):
+            problems.append(f"'{field}[{index}].description' must be an array")
+
+def validate_portfolio(document):
+    problems = []
+    if not isinstance(document, dict):
+        raise PortfolioParseError("Portfolio must be a JSON object.")
+    for field in ("full_name", "about"):
+        if not isinstance(document.get(field), str):
+            problems.append(f"'{field}' must be a string")
+    for field in ("services", "tools"):
+        if field in document and not isinstance(document[field], list):
+            problems.append(f"'{field}' must be an array")
+    _require_list_of_dicts(document, "projects", problems)
+    _require_list_of_dicts(document, "experience", problems)
+    if problems:
+        raise PortfolioParseError("Portfolio failed validation: " + "; ".join(problems))
+    return document
+
+def validate_section(section, document):
+    if not isinstance(document, dict) or section not in document:
+        raise PortfolioParseError(f"AI response is missing the '{section}' section.")
+    problems = []
+    if section == "about":
+        if not isinstance(document["about"], str):
+            problems.append("'about' must be a string")
+    else:
+        _require_list_of_dicts(document, section, problems)
+    if problems:
+        raise PortfolioParseError("Section failed validation: " + "; ".join(problems))
+    return document
+
+def _load(text, validator):
+    return validator(json.loads(text)) if validator else json.loads(text)
+
+def parse_portfolio_output(text, validator=validate_portfolio, fix=None):
+    # clean parse -> local repair -> at most one cheap "fix this JSON" call.
+    # Every outcome is counted so repairs can be compared with the full
+    # regenerations they replace.
+    candidate = extract_json_candidate(text)
+    try:
+        document = _load(candidate, validator)
+        parse_stats.increment("clean")
+        return document
+    except (ValueError, TypeError) as first_error:
+        error = first_error
+
+    try:
+        document = _load(repair_json(candidate), validator)
+        logging.info(f"Repaired malformed AI JSON: {error}")
+        parse_stats.increment("repaired")
+        return document
+    except (ValueError, TypeError) as repair_error:
+        error = repair_error
+
+    if fix is not None:
+        parse_stats.increment("fix_calls")
+        try:
+            fixed = fix(candidate, str(error))
+            return _load(repair_json(extract_json_candidate(fixed)), validator)
+        except Exception as fix_error:
+            error = fix_error
+
+    parse_stats.increment("failed")
+    logging.error(f"AI JSON could not be parsed or repaired: {error}")
+    raise PortfolioParseError(f"AI returned invalid JSON: {error}")
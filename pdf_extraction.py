@@ -0,0 +1,78 @@
+import io
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_process_pool():
+    # forkserver children start from a clean process instead of copying the
+    # web worker's threads and locks; PyPDF2 is preloaded into the server.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                context = multiprocessing.get_context(Config.PDF_POOL_START_METHOD)
+                if Config.PDF_POOL_START_METHOD == "forkserver":
+                    context.set_forkserver_preload(["PyPDF2", "pdf_extraction"])
+                _pool = ProcessPoolExecutor(max_workers=Config.PDF_WORKERS, mp_context=context)
+    return _pool
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def reset_process_pool():
+    # After fork the inherited executor belongs to the parent; the child
+    # must not shut it down or submit to it, only forget it.
+    global _pool
+    _pool = None
+
+def _extract_page_range(source, start, stop):
+    # Runs in a worker process. 'source' is a file path for spooled resumes
+    # or the raw bytes for small in-memory ones.
+    from PyPDF2 import PdfReader
+    reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+def _worker_source(stream):
+    name = getattr(stream, "name", None)
+    if isinstance(name, str):
+        stream.flush()
+        return name
+    return stream.getvalue()
+
+def extract_page_texts(stream):
+    # Yields page text in page order. Large documents are split into
+    # contiguous page ranges across the process pool; small ones are walked
+    # inline because pickling and a second parse would cost more than they
+    # save. Closing the generator early cancels ranges not yet started.
+    # PyPDF2 is imported on the first resume, not at startup.
+    from PyPDF2 import PdfReader
+    reader = PdfReader(stream)
+    page_count = min(len(reader.pages), Config.RESUME_MAX_PAGES)
+
+    if Config.PDF_WORKERS <= 1 or page_count < Config.PDF_PARALLEL_MIN_PAGES:
+        for index in range(page_count):
+            yield reader.pages[index].extract_text() or ""
+        return
+
+    source = _worker_source(stream)
+    chunk_size = max(1, -(-page_count // (Config.PDF_WORKERS * 2)))
+    pool = get_process_pool()
+    futures = [
+        pool.submit(_extract_page_range, source, start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+    try:
+        for future in futures:
+            for page_text in future.result():
+                yield page_text
+    finally:
+        for future in futures:
+            future.cancel()
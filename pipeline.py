@@ -0,0 +1,267 @@
+import re
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from config import Config
+from stages import StageGraph
+from services import extract_text_from_pdf_url, map_services_and_tools, generate_portfolio, regenerate_portfolio
+from output_parser import PortfolioParseError
+from llm import llm_priority, LLMOverloadedError, BATCH
+from coalesce import portfolio_flights
+from portfolio_store import source_fingerprint
+
+class UserNotFoundError(LookupError):
+    pass
+
+def normalize_user_id(user_id):
+    if not isinstance(user_id, str):
+        raise ValueError("Missing 'user_id' in request data.")
+    user_id = user_id.strip()
+    if not user_id:
+        raise ValueError("Empty 'user_id' provided.")
+    # Validate user_id format
+    if not ObjectId.is_valid(user_id):
+        raise ValueError("Invalid 'user_id' format.")
+    return user_id
+
+def validate_user_data(user, freelancer):
+    if user:
+        required_user_fields = ['first_name', 'last_name', 'github_profile', 'profile_photo']
+        for field in required_user_fields:
+            if field not in user:
+                logging.warning(f"User data missing field: {field}")
+    if freelancer:
+        required_freelancer_fields = ['name', 'work_description', 'portfolio_website', 'skills', 'tools']
+        for field in required_freelancer_fields:
+            if field not in freelancer:
+                logging.warning(f"Freelancer data missing field: {field}")
+
+def fetch_profile(db, user_id):
+    # Fetch user and freelancer data
+    user, freelancer = db.get_profile(user_id)
+
+    if not freelancer and not user:
+        raise UserNotFoundError("User not found.")
+
+    # Validate fetched data
+    validate_user_data(user, freelancer)
+    return user, freelancer
+
+def extract_resume_text(freelancer):
+    # Extract resume text if available. Download and parse errors propagate
+    # so the resume stage's fallback records the run as degraded.
+    if freelancer and "resume" in freelancer and isinstance(freelancer["resume"], dict):
+        resume_url = freelancer["resume"].get("url")
+        if resume_url:
+            return extract_text_from_pdf_url(resume_url)
+    return None
+
+def build_portfolio_data(user, freelancer):
+    # Construct freelancer name
+    freelancer_name = "N/A"
+    if user:
+        first_name = user.get("first_name", "").strip()
+        last_name = user.get("last_name", "").strip()
+        full_name = (first_name + " " + last_name).strip()
+        if full_name:
+            freelancer_name = full_name
+    if (freelancer_name == "N/A" or not freelancer_name) and freelancer:
+        freelancer_name = freelancer.get("name", "N/A")
+
+    # Safeguard the 'work_description' processing
+    about = ""
+    if freelancer and "work_description" in freelancer:
+        work_description = freelancer["work_description"]
+        if isinstance(work_description, str):
+            about = re.sub(r"<.*?>", "", work_description).strip()
+        else:
+            logging.warning(f"'work_description' is not a string: {work_description}")
+            about = ""
+
+    # Extract other details
+    github_link = user.get("github_profile") if user else None
+    portfolio_website = freelancer.get("portfolio_website") if freelancer else ""
+    portfolio_website = portfolio_website or ""  # Ensure string
+    project_links = freelancer.get("project_links") if freelancer else ""
+    project_links = project_links or ""  # Ensure string
+    linkedin_link = freelancer.get("linkedIn_profile") if freelancer else None
+
+    behance_link = portfolio_website if "behance.net" in portfolio_website else None
+    dribbble_link = project_links if "dribbble.com" in project_links else None
+    portfolio_link = portfolio_website if portfolio_website.strip() and not behance_link and not dribbble_link else None
+
+    freelancer_skills = freelancer.get("skills", []) if freelancer else []
+    freelancer_tools = freelancer.get("tools", []) if freelancer else []
+    combined_skills = freelancer_skills + freelancer_tools
+    matched_services, matched_tools = map_services_and_tools(combined_skills)
+
+    profile_photo = user.get("profile_photo") if user and "profile_photo" in user else None
+    if not profile_photo and freelancer and "profile_photo" in freelancer:
+        profile_photo = freelancer["profile_photo"]
+
+    # Prepare data for AI
+    return {
+        "full_name": freelancer_name,
+        "about": about,
+        "github_link": github_link,
+        "behance_link": behance_link,
+        "dribbble_link": dribbble_link,
+        "portfolio_link": portfolio_link,
+        "linkedin_link": linkedin_link,
+        "profile_photo": profile_photo,
+        "services": matched_services,
+        "tools": matched_tools
+    }
+
+def add_profile_stage(graph, db, user_id):
+    return graph.add("profile", lambda: fetch_profile(db, user_id), timeout=Config.PROFILE_STAGE_TIMEOUT)
+
+def load_profile(db, user_id):
+    return add_profile_stage(StageGraph(), db, user_id).run()["profile"]
+
+def build_stage_graph(db, user_id, generate=True, profile=None, generator=generate_portfolio):
+    # profile -> (resume || details) -> generate. The resume download starts
+    # as soon as the profile round trip returns, while HTML stripping and
+    # skill mapping run alongside it. A slow or failing resume degrades to
+    # generating without resume text instead of failing the request. A
+    # profile the caller already fetched is used as is, and 'generator'
+    # replaces the full generation (e.g. with an incremental one).
+    graph = StageGraph()
+    if profile is None:
+        add_profile_stage(graph, db, user_id)
+    else:
+        graph.resolve("profile", profile)
+    (
+        graph
+        .add("resume", lambda profile: extract_resume_text(profile[1]), deps=["profile"],
+             timeout=Config.RESUME_STAGE_TIMEOUT, fallback=None)
+        .add("details", lambda profile: build_portfolio_data(*profile), deps=["profile"])
+    )
+    if generate:
+        add_generate_stage(graph, generator)
+    return graph
+
+def add_generate_stage(graph, generator=generate_portfolio):
+    # Generate portfolio using AI
+    return graph.add("generate", lambda details, resume: generator(details, resume),
+                     deps=["details", "resume"], timeout=Config.LLM_STAGE_TIMEOUT)
+
+def prepare_portfolio_inputs(db, user_id):
+    run = build_stage_graph(db, user_id, generate=False).run()
+    return run["details"], run["resume"]
+
+def serve_portfolio(db, user_id, flights=None, store=None):
+    # Returns (portfolio, info). A stored portfolio whose source fingerprint
+    # still matches the profile and the resume text is served without
+    # generating; the resume is revalidated first, which is a conditional
+    # request answered from the text cache when the PDF has not changed.
+    # Otherwise concurrent requests for the same sources (double clicks,
+    # client retries) share one LLM call, and the result is written back to
+    # the store. Narrative sections whose inputs did not change since the
+    # stored portfolio are reused, not regenerated.
+    profile = load_profile(db, user_id)
+    inputs = build_stage_graph(db, user_id, generate=False, profile=profile).run()
+    fingerprint = source_fingerprint(*profile, inputs["resume"])
+    # Without the resume the fingerprint says nothing about what the stored
+    # portfolio was generated from, so a degraded run neither reads nor
+    # writes the store.
+    resume_degraded = "resume" in inputs.degraded
+    stored = store.get(user_id) if store is not None and not resume_degraded else None
+    if stored and stored.get("fingerprint") == fingerprint:
+        return stored["portfolio"], {"source": "stored", "reused_sections": [], "etag": stored.get("etag")}
+
+    def generator(details, resume):
+        if not stored:
+            return regenerate_portfolio(details, resume)
+        return regenerate_portfolio(details, resume, stored.get("portfolio"), stored.get("sections"))
+
+    def generate():
+        graph = StageGraph().resolve("details", inputs["details"]).resolve("resume", inputs["resume"])
+        portfolio, reused, sections = add_generate_stage(graph, generator).run()["generate"]
+        if store is not None and not resume_degraded:
+            store.put(user_id, fingerprint, portfolio, sections)
+        return portfolio, reused
+
+    flights = flights or portfolio_flights
+    key = f"{user_id}:{fingerprint}:degraded" if resume_degraded else f"{user_id}:{fingerprint}"
+    portfolio, reused = flights.do(key, generate)
+    return portfolio, {"source": "incremental" if reused else "generated", "reused_sections": reused, "etag": None}
+
+def run_portfolio_pipeline(db, user_id, flights=None, store=None):
+    return serve_portfolio(db, user_id, flights, store)[0]
+
+def run_batch_pipeline(db, user_ids):
+    # Yields one result per user_id as soon as it is ready. Profiles are
+    # loaded with two $in queries, resumes download concurrently and LLM
+    # calls run on a separate, smaller pool so the provider never sees more
+    # than BATCH_LLM_CONCURRENCY requests from one batch.
+    results = queue.Queue()
+    valid_ids = []
+    for user_id in user_ids:
+        try:
+            valid_ids.append(normalize_user_id(user_id))
+        except ValueError as ve:
+            results.put({"user_id": user_id, "status": 400, "error": str(ve)})
+
+    users = db.get_users(valid_ids) if valid_ids else {}
+    freelancers = db.get_freelancers(valid_ids) if valid_ids else {}
+
+    download_pool = ThreadPoolExecutor(max_workers=Config.BATCH_DOWNLOAD_CONCURRENCY, thread_name_prefix="batch-resume")
+    llm_pool = ThreadPoolExecutor(max_workers=Config.BATCH_LLM_CONCURRENCY, thread_name_prefix="batch-llm")
+    # Backpressure: downloads pause once this many prepared profiles are
+    # waiting for the LLM, so resume text for the whole batch never piles up.
+    llm_slots = threading.BoundedSemaphore(Config.BATCH_LLM_CONCURRENCY * 2)
+
+    def generate(user_id, portfolio_data, resume_text):
+        try:
+            with llm_priority(BATCH):
+                portfolio_json = generate_portfolio(portfolio_data, resume_text)
+            results.put({"user_id": user_id, "status": 200, "portfolio": portfolio_json})
+        except PortfolioParseError as pe:
+            results.put({"user_id": user_id, "status": 502, "error": str(pe)})
+        except LLMOverloadedError as oe:
+            results.put({"user_id": user_id, "status": 429, "error": str(oe), "retry_after": oe.retry_after})
+        except ValueError as ve:
+            results.put({"user_id": user_id, "status": 400, "error": str(ve)})
+        except Exception as e:
+            logging.error(f"Batch generation failed for {user_id}: {e}")
+            results.put({"user_id": user_id, "status": 500, "error": "Internal Server Error."})
+        finally:
+            llm_slots.release()
+
+    def prepare(user_id):
+        try:
+            user = users.get(user_id)
+            freelancer = freelancers.get(user_id)
+            if not freelancer and not user:
+                results.put({"user_id": user_id, "status": 404, "error": "User not found."})
+                return
+            validate_user_data(user, freelancer)
+            try:
+                resume_text = extract_resume_text(freelancer)
+            except Exception as e:
+                # Same degradation as the resume stage: generate without it
+                logging.error(f"Error extracting resume text: {e}")
+                resume_text = None
+            portfolio_data = build_portfolio_data(user, freelancer)
+            llm_slots.acquire()
+            try:
+                llm_pool.submit(generate, user_id, portfolio_data, resume_text)
+            except Exception:
+                llm_slots.release()
+                raise
+        except Exception as e:
+            logging.error(f"Batch preparation failed for {user_id}: {e}")
+            results.put({"user_id": user_id, "status": 500, "error": "Internal Server Error."})
+
+    try:
+        for user_id in valid_ids:
+            download_pool.submit(prepare, user_id)
+        for _ in range(len(user_ids)):
+            yield results.get()
+    finally:
+        # Stops outstanding work if the client goes away mid-stream
+        download_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,47 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from config import Config
+from coalesce import profile_fingerprint
+from utils import dumps, content_etag
+
+def source_fingerprint(user, freelancer, resume_text=None):
+    # Everything a stored portfolio was generated from: the projected
+    # profile, the extracted resume text (a new PDF at the same URL changes
+    # it) and the settings that change the model's output.
+    resume_hash = hashlib.sha256((resume_text or "").encode("utf-8")).hexdigest()
+    source = f"{profile_fingerprint(user, freelancer)}:{resume_hash}:{Config.LLM_MODEL}:{Config.GENERATION_MODE}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+class PortfolioStore:
+    # Latest generated portfolio per user in the 'portfolios' collection,
+    # tagged with the source fingerprint it was generated from and the
+    # per-section fingerprints used to regenerate only what changed. The
+    # ETag of the serialized portfolio is kept with it, so conditional
+    # requests are answered without serializing the document again.
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get(self, user_id):
+        try:
+            return self.collection.find_one({"_id": ObjectId(user_id)}, {"fingerprint": 1, "sections": 1, "etag": 1, "portfolio": 1})
+        except Exception as e:
+            logging.error(f"Error reading stored portfolio: {e}")
+            raise e
+
+    def put(self, user_id, fingerprint, portfolio, sections=None):
+        try:
+            self.collection.replace_one(
+                {"_id": ObjectId(user_id)},
+                {"fingerprint": fingerprint, "sections": sections or {}, "portfolio": portfolio,
+                 "etag": content_etag(dumps(portfolio)), "generated_at": datetime.now(timezone.utc)},
+                upsert=True
+            )
+        except Exception as e:
+            # The portfolio was generated; failing to store it only costs a
+            # regeneration next time.
+            logging.error(f"Error storing portfolio: {e}")
+
+    def delete(self, user_id):
+        self.collection.delete_one({"_id": ObjectId(user_id)})
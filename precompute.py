@@ -0,0 +1,161 @@
+# precompute.py
+# Background worker that regenerates portfolios when profiles change, so
+# /generate_portfolio can serve them from the 'portfolios' collection.
+# Runs as its own process next to the web workers:
+#   python precompute.py
+# With METRICS_DIR set to the same directory as the web workers' (set it
+# explicitly; otherwise gunicorn picks a private temp directory), its
+# counters are included in their /metrics output.
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from pymongo.errors import OperationFailure, PyMongoError
+from config import Config
+from db import Database
+from coalesce import create_single_flight
+from portfolio_store import PortfolioStore
+from pipeline import UserNotFoundError, serve_portfolio
+from llm import llm_priority, LLMOverloadedError, BATCH
+from metrics import registry, precompute_total
+from utils import setup_logging
+
+class PrecomputeWorker:
+    # Change events only enqueue user ids; a small pool regenerates them.
+    # A user already waiting in the queue is not queued twice, and a
+    # refresh whose fingerprint still matches the stored portfolio is a
+    # no-op, so bursts of edits cost one generation.
+    def __init__(self, db, store, flights=None, workers=None, mode=None, poll_interval=None):
+        self.db = db
+        self.store = store
+        self.flights = flights
+        self.workers = workers or Config.PRECOMPUTE_WORKERS
+        self.mode = mode or Config.PRECOMPUTE_MODE
+        self.poll_interval = Config.PRECOMPUTE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def enqueue(self, user_id):
+        if user_id is None:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            if user_id in self.pending:
+                return
+            self.pending.add(user_id)
+        self.queue.put(user_id)
+
+    def refresh(self, user_id):
+        try:
+            with llm_priority(BATCH):
+                _, info = serve_portfolio(self.db, user_id, self.flights, self.store)
+            precompute_total.inc(outcome=info["source"])
+        except UserNotFoundError:
+            self.store.delete(user_id)
+            precompute_total.inc(outcome="deleted")
+        except LLMOverloadedError:
+            # Interactive traffic has the LLM; the user's next request
+            # generates on demand.
+            precompute_total.inc(outcome="shed")
+        except Exception as e:
+            logging.error(f"Precompute failed for {user_id}: {e}")
+            precompute_total.inc(outcome="failed")
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"precompute-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        for _ in self._threads:
+            self.queue.put(None)
+
+    def run_forever(self):
+        self.start()
+        if self.mode in ("auto", "change_stream"):
+            try:
+                self.watch_changes()
+                return
+            except OperationFailure as of:
+                # Standalone mongod: change streams need a replica set
+                if self.mode == "change_stream":
+                    raise of
+                logging.warning(f"Change streams unavailable ({of}); polling '{Config.PRECOMPUTE_UPDATED_FIELD}'.")
+        self.poll_changes()
+
+    def watch_changes(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": [self.db.users_collection.name, self.db.freelancers_collection.name]},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }}]
+        with self.db.db.watch(pipeline, full_document="updateLookup") as stream:
+            logging.info("Watching users and freelancers for changes.")
+            while not self.stop_event.is_set():
+                change = stream.try_next()
+                if change is None:
+                    time.sleep(0.1)
+                    continue
+                self.handle_change(change)
+
+    def handle_change(self, change):
+        if change["ns"]["coll"] == self.db.users_collection.name:
+            self.enqueue(change["documentKey"]["_id"])
+        elif change.get("fullDocument"):
+            self.enqueue(change["fullDocument"].get("user_id"))
+        # A deleted freelancer document no longer says whose it was; the
+        # stored portfolio is replaced on that user's next request.
+
+    def poll_changes(self):
+        field = Config.PRECOMPUTE_UPDATED_FIELD
+        for collection in (self.db.users_collection, self.db.freelancers_collection):
+            collection.create_index(field)
+        since = datetime.now(timezone.utc)
+        while not self.stop_event.wait(self.poll_interval):
+            cutoff = datetime.now(timezone.utc)
+            try:
+                for user in self.db.users_collection.find({field: {"$gt": since}}, {"_id": 1}):
+                    self.enqueue(user["_id"])
+                for freelancer in self.db.freelancers_collection.find({field: {"$gt": since}}, {"user_id": 1}):
+                    self.enqueue(freelancer.get("user_id"))
+                since = cutoff
+            except PyMongoError as e:
+                logging.error(f"Polling for profile changes failed: {e}")
+
+    def _work(self):
+        while True:
+            user_id = self.queue.get()
+            if user_id is None:
+                return
+            with self._lock:
+                self.pending.discard(user_id)
+            self.refresh(user_id)
+
+def main():
+    setup_logging()
+    try:
+        Config.validate()
+    except ValueError as ve:
+        logging.error(f"Configuration Error: {ve}")
+        exit(1)
+    if Config.METRICS_DIR:
+        registry.enable_multiprocess(Config.METRICS_DIR, Config.METRICS_FLUSH_INTERVAL)
+    db = Database()
+    worker = PrecomputeWorker(db, PortfolioStore(db.portfolios_collection), create_single_flight(db))
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+        db.close()
+        if Config.METRICS_DIR:
+            registry.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import re
+import logging
+from config import Config
+
+# Section headings as they commonly appear in resumes, mapped to the
+# section they start.
+SECTION_HEADINGS = {
+    "experience": [
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "career history"
+    ],
+    "projects": ["projects", "personal projects", "key projects", "selected projects", "portfolio"],
+    "summary": ["summary", "professional summary", "profile", "about", "about me", "objective", "career objective"],
+    "skills": [
+        "skills", "technical skills", "key skills", "core competencies", "competencies",
+        "tools", "technologies", "tech stack"
+    ],
+    "certifications": ["certifications", "certificates", "awards", "achievements", "honors", "publications"],
+    "education": ["education", "academic background", "academics", "qualifications"],
+    "languages": ["languages"],
+    "interests": ["interests", "hobbies", "hobbies and interests", "extracurricular activities"],
+    "references": ["references", "referees"],
+    "declaration": ["declaration"]
+}
+
+# Lower number = kept longer when the resume is over budget. Sections
+# without a priority are dropped outright.
+SECTION_PRIORITY = {
+    "experience": 0,
+    "projects": 1,
+    "summary": 2,
+    "skills": 3,
+    "certifications": 4,
+    "header": 5,
+    "education": 6,
+    "languages": 7,
+    "interests": 8
+}
+
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^references (are )?(available )?(up)?on request\.?$", re.IGNORECASE),
+    re.compile(r"^page \d+( of \d+)?$", re.IGNORECASE),
+    re.compile(r"^\d+\s*/\s*\d+$"),
+    re.compile(r"^(curriculum vitae|resume|résumé|cv)$", re.IGNORECASE),
+    re.compile(r"^i hereby declare\b", re.IGNORECASE)
+]
+
+_HEADING_LOOKUP = {
+    heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings
+}
+_HEADING_CLEANUP = re.compile(r"[^a-z ]+")
+
+def estimate_tokens(text):
+    # Gemini averages roughly four characters per token for English prose;
+    # an estimate keeps budgeting free of an extra API round trip.
+    if not text:
+        return 0
+    return -(-len(text) // Config.PROMPT_CHARS_PER_TOKEN)
+
+def section_for_heading(line):
+    if len(line) > 40:
+        return None
+    key = " ".join(_HEADING_CLEANUP.sub(" ", line.lower()).split())
+    return _HEADING_LOOKUP.get(key)
+
+# A short line seen at least this often is taken for a page header or
+# footer (name, contact line) rather than content such as a job title that
+# two roles happen to share.
+REPEATED_LINE_MIN = 3
+REPEATED_LINE_MAX_CHARS = 60
+
+def _fingerprint(line):
+    return " ".join(line.lower().split())
+
+def page_furniture(lines):
+    counts = {}
+    for line in lines:
+        if len(line) <= REPEATED_LINE_MAX_CHARS:
+            fingerprint = _fingerprint(line)
+            counts[fingerprint] = counts.get(fingerprint, 0) + 1
+    return {fingerprint for fingerprint, count in counts.items() if count >= REPEATED_LINE_MIN}
+
+def segment_resume(resume_text, drop_repeated=False):
+    # Returns [(section, heading line or None, [lines])] in document order.
+    # Boilerplate is dropped while segmenting; with 'drop_repeated', so are
+    # consecutive duplicate lines and page headers/footers.
+    lines = [line.strip() for line in resume_text.split("\n")]
+    furniture = page_furniture(lines) if drop_repeated else set()
+    sections = [("header", None, [])]
+    previous = None
+    for line in lines:
+        if not line or any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS):
+            continue
+        fingerprint = _fingerprint(line)
+        if drop_repeated and (fingerprint == previous or fingerprint in furniture):
+            continue
+        previous = fingerprint
+        section = section_for_heading(line)
+        if section:
+            sections.append((section, line, []))
+            continue
+        sections[-1][2].append(line)
+    return [section for section in sections if section[2]]
+
+def render_sections(sections):
+    blocks = []
+    for _, heading, lines in sections:
+        blocks.append("\n".join(([heading] if heading else []) + lines))
+    return "\n\n".join(blocks)
+
+def _kept_sections(resume_text, drop_repeated):
+    return [
+        (name, heading, list(lines)) for name, heading, lines in segment_resume(resume_text, drop_repeated)
+        if name in SECTION_PRIORITY
+    ]
+
+def compress_resume(resume_text, token_budget):
+    original_tokens = estimate_tokens(resume_text)
+    sections = _kept_sections(resume_text, drop_repeated=False)
+    compressed = render_sections(sections)
+    tokens = estimate_tokens(compressed)
+    if tokens > token_budget:
+        # Repeated lines are only worth losing when the resume has to shrink
+        sections = _kept_sections(resume_text, drop_repeated=True)
+        compressed = render_sections(sections)
+        tokens = estimate_tokens(compressed)
+
+    # Trim the lowest-priority section from its end until the resume fits;
+    # once a section is empty move on to the next lowest. Per-line estimates
+    # drift slightly from the rendered text, so re-measure after each pass.
+    truncated = []
+    while tokens > token_budget and any(lines for _, _, lines in sections):
+        for name, _, lines in sorted(sections, key=lambda section: SECTION_PRIORITY[section[0]], reverse=True):
+            if tokens <= token_budget:
+                break
+            if lines and name not in truncated:
+                truncated.append(name)
+            while lines and tokens > token_budget:
+                tokens -= estimate_tokens(lines.pop() + "\n")
+        sections = [section for section in sections if section[2]]
+        compressed = render_sections(sections)
+        tokens = estimate_tokens(compressed)
+
+    return compressed, {
+        "resume_original": original_tokens,
+        "resume": tokens,
+        "resume_budget": token_budget,
+        "truncated_sections": truncated
+    }
+
+class PromptBuild:
+    def __init__(self, text, token_counts):
+        self.text = text
+        self.token_counts = token_counts
+
+def build_prompt(render, resume_text, budget=None):
+    # 'render' formats the prompt around a resume string. The template is
+    # measured first so the resume gets whatever remains of the budget.
+    budget = Config.PROMPT_TOKEN_BUDGET if budget is None else budget
+    template_tokens = estimate_tokens(render(""))
+    if resume_text:
+        compressed, counts = compress_resume(resume_text, max(0, budget - template_tokens))
+    else:
+        compressed, counts = resume_text, {"resume_original": 0, "resume": 0, "truncated_sections": []}
+    text = render(compressed)
+    counts.update(template=template_tokens, total=estimate_tokens(text), budget=budget)
+    if counts["truncated_sections"]:
+        logging.info(f"Prompt over budget; truncated resume sections: {counts['truncated_sections']}")
+    return PromptBuild(text, counts)
@@ -1,167 +1,345 @@
-import re
 import io
-import requests
+import contextvars
+import time
+import hashlib
+import tempfile
 import json
 import logging
-from PyPDF2 import PdfReader
-from langchain_google_genai import ChatGoogleGenerativeAI
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from catalog import catalog_index
+from cache import ResumeTextCache, ValidatorStore
+from pdf_extraction import extract_page_texts
+from normalizer import normalize_resume_text
+from prompt_builder import build_prompt
+from http_client import get_session, request_timeout, conditional_headers
+from llm import get_llm, llm_scheduler
+from metrics import span, timed, record_llm_usage
+from output_parser import PortfolioParseError, parse_portfolio_output, validate_portfolio, validate_section
 
-# Services Mapping and Tools List (as provided)
-SERVICES_MAPPING = {
-    "GRAPHIC DESIGNING (2D/3D)": [
-        "Logos", "Business Cards", "Banners", "Brochures", "Social Media Posts",
-        "Infographics (2D/3D)", "Flvers", "Posters", "Packaging Design",
-        "Illustrations (2D/3D)", "Merch Design", "3D Modelling", "Animation (2D/3D)"
-    ],
-    # ... (rest of the services)
-}
+resume_cache = ResumeTextCache()
+resume_validators = ValidatorStore()
 
-TOOLS_LIST = [
-    "Adalo", "Andromo", "AppGyver", "Airtable", "ActiveCampaign", "Appian", "Appsheet",
-    # ... (rest of the tools)
-]
+class ResumeTooLargeError(ValueError):
+    pass
 
 def extract_text_from_pdf_url(url):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        pdf_reader = PdfReader(io.BytesIO(response.content))
-        
-        text_content = []
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_content.append(page_text)
-    
-        all_text = "\n".join(text_content)
-        # Normalize whitespace
-        all_text = re.sub(r"[ \t]+", " ", all_text)
-        all_text = re.sub(r"(\r\n|\r|\n)+", "\n", all_text)
-    
-        lines = all_text.split("\n")
-        cleaned_lines = []
-        for line in lines:
-            parts = line.split(" ")
-            single_chars = sum(len(p) == 1 for p in parts if p.strip())
-            if len(parts) > 1 and single_chars > (len(parts) / 2):
-                new_line_words = []
-                current_word_chars = []
-                for token in parts:
-                    if len(token) == 1:
-                        current_word_chars.append(token)
-                    else:
-                        if current_word_chars:
-                            new_line_words.append("".join(current_word_chars))
-                            current_word_chars = []
-                        new_line_words.append(token)
-                if current_word_chars:
-                    new_line_words.append("".join(current_word_chars))
-                cleaned_lines.append(" ".join(new_line_words))
-            else:
-                cleaned_lines.append(line)
-    
-        cleaned_text = "\n".join(l.strip() for l in cleaned_lines if l.strip())
-        return cleaned_text
+        session = get_session()
+        validators = resume_validators.get(url)
+        with span("resume.request"):
+            response = session.get(url, headers=conditional_headers(validators), timeout=request_timeout(), stream=True)
+        if response.status_code == 304 and validators:
+            response.close()
+            cached_text = resume_cache.get(url, validators["content_hash"])
+            if cached_text is not None:
+                return cached_text
+            # Validators outlived the cached text; fetch the full body again
+            resume_validators.discard(url)
+            with span("resume.request"):
+                response = session.get(url, timeout=request_timeout(), stream=True)
+
+        with response, download_resume(response) as (spool, content_hash):
+            resume_validators.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), content_hash)
+
+            cached_text = resume_cache.get(url, content_hash)
+            if cached_text is not None:
+                return cached_text
+
+            started = time.perf_counter()
+            with span("resume.extract"):
+                cleaned_text = extract_text_from_pdf(spool)
+            resume_cache.put(url, content_hash, cleaned_text, time.perf_counter() - started)
+            return cleaned_text
     except Exception as e:
         logging.error(f"Error extracting text from PDF: {e}")
         raise e
 
+class ResumeSpool:
+    # Collects the body as it streams in: small resumes stay in memory,
+    # anything past the spool threshold goes to a temp file, and anything
+    # past RESUME_MAX_BYTES is rejected before it is fully read. Shared by
+    # the requests and httpx download paths.
+    def __init__(self, declared_length=None):
+        if declared_length and declared_length.isdigit() and int(declared_length) > Config.RESUME_MAX_BYTES:
+            raise ResumeTooLargeError(f"Resume is {declared_length} bytes; limit is {Config.RESUME_MAX_BYTES}.")
+        self.threshold = spool_threshold()
+        self.file = io.BytesIO()
+        self.hasher = hashlib.sha256()
+        self.total = 0
+        if declared_length and declared_length.isdigit() and int(declared_length) > self.threshold:
+            # Known to be large: skip the in-memory buffer and its copy
+            self.spill()
+
+    def spill(self):
+        # Spills to a named temp file so pdf_extraction workers can open it by path
+        spilled = tempfile.NamedTemporaryFile(prefix="resume-", suffix=".pdf")
+        with self.file.getbuffer() as view:
+            spilled.write(view)
+        self.file.close()
+        self.file = spilled
+
+    def write(self, chunk):
+        self.total += len(chunk)
+        if self.total > Config.RESUME_MAX_BYTES:
+            raise ResumeTooLargeError(f"Resume exceeds {Config.RESUME_MAX_BYTES} bytes.")
+        if self.total > self.threshold and isinstance(self.file, io.BytesIO):
+            self.spill()
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self):
+        self.file.seek(0)
+        return self.file, self.hasher.hexdigest()
+
+    def close(self):
+        self.file.close()
+
+def spool_threshold():
+    # An in-memory resume is held once by the spool and may be copied once
+    # more for a pdf_extraction worker, which leaves half of the peak memory
+    # ceiling for PyPDF2 itself.
+    return min(Config.RESUME_SPOOL_THRESHOLD, Config.RESUME_PEAK_MEMORY_BYTES // 4)
+
+@contextmanager
+def download_resume(response):
+    response.raise_for_status()
+    spool = ResumeSpool(response.headers.get("Content-Length"))
+    try:
+        with span("resume.download"):
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                spool.write(chunk)
+        yield spool.finish()
+    finally:
+        spool.close()
+
+def extract_text_from_pdf(stream):
+    page_texts = extract_page_texts(stream)
+    try:
+        return normalize_resume_text(limit_page_text(page_texts))
+    finally:
+        page_texts.close()
+
+def limit_page_text(page_texts):
+    # Stop walking pages once the prompt has all the resume text it can use
+    collected = 0
+    for page_text in page_texts:
+        yield page_text
+        collected += len(page_text)
+        if collected >= Config.RESUME_MAX_CHARS:
+            return
+
 def map_services_and_tools(skills):
     try:
-        matched_services = []
-        for category, items in SERVICES_MAPPING.items():
-            category_matches = [s for s in skills if s in items]
-            if category_matches:
-                matched_services.append({
-                    "category": category,
-                    "services": category_matches
-                })
-        matched_tools = [t for t in skills if t in TOOLS_LIST]
-        return matched_services, matched_tools
+        return catalog_index.match(skills)
     except Exception as e:
         logging.error(f"Error mapping services and tools: {e}")
         raise e
 
-def initialize_llm(api_key):
+def render_portfolio_prompt(data, resume_text):
+    return f"""
+    You are an AI assistant. You have the following data about a freelancer:
+    
+    Full Name: {data['full_name']}
+    About (raw): {data['about']}
+    Github link: {data.get('github_link')}
+    Behance link: {data.get('behance_link')}
+    Dribbble link: {data.get('dribbble_link')}
+    Portfolio link: {data.get('portfolio_link')}
+    LinkedIn link: {data.get('linkedin_link')}
+    Profile Photo: {data.get('profile_photo')}
+    
+    Services (Matched from freelancer skills):
+    {json.dumps(data['services'], separators=(",", ":"))}
+    
+    Tools (Matched from freelancer tools):
+    {json.dumps(data['tools'], separators=(",", ":"))}
+    
+    Resume Text (raw):
+    {resume_text}
+    
+    Your task:
+    1. Create a professional and creative portfolio in JSON format with these fields:
+       - full_name
+       - about: A compelling, professional, and creative narrative using all known data.
+       - profile_photo (if available)
+       - github_link (if present)
+       - behance_link (if present)
+       - dribbble_link (if present)
+       - linkedin_link (if present)
+       - portfolio_link (if present and not Behance or Dribbble)
+       - services: array of {{ "category": "CategoryName", "services": ["service1","service2",...] }}
+       - tools: array of tools (strings)
+       - projects: array of {{ "title": "...", "description": ["bullet1","bullet2",...], (optional) "link":"...", (optional)"files":"..." }}
+         Make each bullet point a substantial, well-structured sentence that clearly explains the work done, the context, and the value provided.
+       - experience: array of {{ "title": "...", "company_name": "...", "description": ["bullet1","bullet2",...], "start_date": "MM/YYYY", "end_date": "MM/YYYY or empty if currently working" }}
+         Similarly, make each bullet point more detailed and descriptive, explaining responsibilities, achievements, and the impact made.
+    
+    2. Ensure no repeated fields or invalid JSON. The description arrays should contain multiple, well-structured sentences in bullet form, each providing meaningful detail.
+    
+    3. Produce only a valid JSON object with no extra formatting, no code fences, and no markdown.
+    """
+
+@timed("prompt.build")
+def build_portfolio_prompt(data, resume_text):
+    return build_prompt(lambda resume: render_portfolio_prompt(data, resume), resume_text)
+
+def invoke_llm(prompt, span_name, model=None, temperature=None):
+    with llm_scheduler.slot(), span(span_name):
+        ai_message = get_llm(model=model, temperature=temperature).invoke(prompt)
+    record_llm_usage(model or Config.LLM_MODEL, ai_message)
+    return ai_message
+
+def request_json_fix(broken_json, error):
+    # A repair prompt only echoes the broken JSON back, so it runs on the
+    # small model at temperature 0 instead of regenerating the portfolio.
+    prompt = f"""
+    The following JSON is invalid ({error}).
+    Return only the corrected JSON object with the same content, no code fences and no markdown.
+
+    {broken_json}
+    """
+    ai_message = invoke_llm(prompt, "llm.fix", model=Config.LLM_FIX_MODEL, temperature=0)
+    return ai_message.content
+
+@timed("llm.parse")
+def parse_portfolio_response(response_text, validator=validate_portfolio):
+    # Log the raw AI response for debugging
+    logging.debug(f"AI Response: {response_text}")
+
+    if not response_text or not response_text.strip():
+        logging.error("AI returned an empty response.")
+        raise PortfolioParseError("AI returned an empty response.")
+
+    fix = request_json_fix if Config.LLM_JSON_FIX else None
+    return parse_portfolio_output(response_text, validator=validator, fix=fix)
+
+# Copied straight from portfolio_data in sectioned mode; only the
+# narrative sections go through the LLM.
+DETERMINISTIC_FIELDS = [
+    "full_name", "profile_photo", "github_link", "behance_link", "dribbble_link",
+    "linkedin_link", "portfolio_link", "services", "tools"
+]
+NARRATIVE_SECTIONS = ["about", "projects", "experience"]
+
+SECTION_INSTRUCTIONS = {
+    "about": """- about: A compelling, professional, and creative narrative using all known data.
+    Return only a JSON object of the form { "about": "..." }.""",
+    "projects": """- projects: array of { "title": "...", "description": ["bullet1","bullet2",...], (optional) "link":"...", (optional)"files":"..." }
+      Make each bullet point a substantial, well-structured sentence that clearly explains the work done, the context, and the value provided.
+    Return only a JSON object of the form { "projects": [...] }.""",
+    "experience": """- experience: array of { "title": "...", "company_name": "...", "description": ["bullet1","bullet2",...], "start_date": "MM/YYYY", "end_date": "MM/YYYY or empty if currently working" }
+      Make each bullet point detailed and descriptive, explaining responsibilities, achievements, and the impact made.
+    Return only a JSON object of the form { "experience": [...] }."""
+}
+
+section_executor = ThreadPoolExecutor(max_workers=Config.SECTION_WORKERS, thread_name_prefix="section")
+
+# The profile fields each narrative section's prompt shows the LLM, besides
+# the resume. Services and tools are deterministic fields copied into the
+# portfolio, so a skill or tool edit never regenerates a narrative section.
+SECTION_INPUTS = {
+    "about": ["full_name", "about"],
+    "projects": ["full_name", "about"],
+    "experience": ["full_name"]
+}
+SECTION_INPUT_LABELS = {"full_name": "Full Name", "about": "About (raw)"}
+
+def section_prompt_inputs(section, data):
+    # render_section_prompt and section_fingerprints both read these values
+    return {field: data.get(field) for field in SECTION_INPUTS[section]}
+
+def render_section_prompt(section, data, resume_text):
+    inputs = section_prompt_inputs(section, data)
+    profile_lines = "\n    ".join(f"{SECTION_INPUT_LABELS[field]}: {value}" for field, value in inputs.items())
+    return f"""
+    You are an AI assistant writing one section of a freelancer's portfolio.
+
+    {profile_lines}
+
+    Resume Text (raw):
+    {resume_text}
+
+    Write this section:
+    {SECTION_INSTRUCTIONS[section]}
+
+    Produce only valid JSON with no extra formatting, no code fences, and no markdown.
+    """
+
+def generate_section(section, data, resume_text):
+    prompt = build_prompt(lambda resume: render_section_prompt(section, data, resume), resume_text)
+    logging.debug(f"Prompt token counts for {section}: {prompt.token_counts}")
+    ai_message = invoke_llm(prompt.text, "llm.section")
+    parsed = parse_portfolio_response(ai_message.content, validator=lambda document: validate_section(section, document))
+    return parsed[section]
+
+def deterministic_fields(data):
+    portfolio = {}
+    for field in DETERMINISTIC_FIELDS:
+        value = data.get(field)
+        if value is not None or field in ("full_name", "services", "tools"):
+            portfolio[field] = value
+    return portfolio
+
+def generate_portfolio_sectioned(data, resume_text, sections=None):
+    # Fans the narrative sections out as concurrent, smaller completions;
+    # output length dominates LLM latency, so three short answers in
+    # parallel finish well before one long one.
     try:
-        return ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            verbose=False,
-            temperature=0.5,
-            google_api_key=api_key
-        )
+        portfolio = deterministic_fields(data)
+        futures = {
+            section: section_executor.submit(contextvars.copy_context().run, generate_section, section, data, resume_text)
+            for section in (sections or NARRATIVE_SECTIONS)
+        }
+        for section, future in futures.items():
+            portfolio[section] = future.result()
+        return portfolio
     except Exception as e:
-        logging.error(f"Error initializing LLM: {e}")
+        logging.error(f"Error generating portfolio sections: {e}")
         raise e
 
+def section_fingerprints(data, resume_text):
+    # Hashes exactly what each section prompt renders: the model, the
+    # section's instructions, its profile inputs and the resume.
+    fingerprints = {}
+    for section in NARRATIVE_SECTIONS:
+        inputs = section_prompt_inputs(section, data)
+        source = json.dumps([Config.LLM_MODEL, SECTION_INSTRUCTIONS[section], inputs, resume_text or ""],
+                            sort_keys=True, default=str)
+        fingerprints[section] = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    return fingerprints
+
+def regenerate_portfolio(data, resume_text, previous=None, previous_fingerprints=None):
+    # Returns (portfolio, reused sections, section fingerprints). Narrative
+    # sections whose source text is unchanged since 'previous' was generated
+    # are kept; deterministic fields are always rebuilt from the profile.
+    fingerprints = section_fingerprints(data, resume_text)
+    previous = previous or {}
+    previous_fingerprints = previous_fingerprints or {}
+    reused = [
+        section for section in NARRATIVE_SECTIONS
+        if section in previous and previous_fingerprints.get(section) == fingerprints[section]
+    ]
+    if not reused:
+        return generate_portfolio(data, resume_text), [], fingerprints
+
+    stale = [section for section in NARRATIVE_SECTIONS if section not in reused]
+    portfolio = generate_portfolio_sectioned(data, resume_text, stale) if stale else deterministic_fields(data)
+    for section in reused:
+        portfolio[section] = previous[section]
+    return portfolio, reused, fingerprints
+
 def generate_portfolio(data, resume_text):
+    if Config.GENERATION_MODE == "sectioned":
+        return generate_portfolio_sectioned(data, resume_text)
     try:
-        instructions = f"""
-        You are an AI assistant. You have the following data about a freelancer:
-        
-        Full Name: {data['full_name']}
-        About (raw): {data['about']}
-        Github link: {data.get('github_link')}
-        Behance link: {data.get('behance_link')}
-        Dribbble link: {data.get('dribbble_link')}
-        Portfolio link: {data.get('portfolio_link')}
-        LinkedIn link: {data.get('linkedin_link')}
-        Profile Photo: {data.get('profile_photo')}
-        
-        Services (Matched from freelancer skills):
-        {json.dumps(data['services'], indent=2)}
-        
-        Tools (Matched from freelancer tools):
-        {json.dumps(data['tools'], indent=2)}
-        
-        Resume Text (raw):
-        {resume_text}
-        
-        Your task:
-        1. Create a professional and creative portfolio in JSON format with these fields:
-           - full_name
-           - about: A compelling, professional, and creative narrative using all known data.
-           - profile_photo (if available)
-           - github_link (if present)
-           - behance_link (if present)
-           - dribbble_link (if present)
-           - linkedin_link (if present)
-           - portfolio_link (if present and not Behance or Dribbble)
-           - services: array of {{ "category": "CategoryName", "services": ["service1","service2",...] }}
-           - tools: array of tools (strings)
-           - projects: array of {{ "title": "...", "description": ["bullet1","bullet2",...], (optional) "link":"...", (optional)"files":"..." }}
-             Make each bullet point a substantial, well-structured sentence that clearly explains the work done, the context, and the value provided.
-           - experience: array of {{ "title": "...", "company_name": "...", "description": ["bullet1","bullet2",...], "start_date": "MM/YYYY", "end_date": "MM/YYYY or empty if currently working" }}
-             Similarly, make each bullet point more detailed and descriptive, explaining responsibilities, achievements, and the impact made.
-        
-        2. Ensure no repeated fields or invalid JSON. The description arrays should contain multiple, well-structured sentences in bullet form, each providing meaningful detail.
-        
-        3. Produce only a valid JSON object with no extra formatting, no code fences, and no markdown.
-        """
-        llm = initialize_llm(Config.GOOGLE_API_KEY)
-        ai_message = llm.invoke(instructions)
-        response_text = ai_message.content
-
-        # Log the raw AI response for debugging
-        logging.debug(f"AI Response: {response_text}")
-
-        cleaned_response = response_text.strip()
-        cleaned_response = re.sub(r"```[\s\S]*?```", "", cleaned_response).strip()
-
-        # Log the cleaned response
-        logging.debug(f"Cleaned AI Response: {cleaned_response}")
-
-        if not cleaned_response:
-            logging.error("AI returned an empty response.")
-            raise ValueError("AI returned an empty response.")
-
-        parsed_json = json.loads(cleaned_response)
-        return parsed_json
-    except json.JSONDecodeError as je:
-        logging.error(f"JSON decoding failed: {je}")
-        logging.debug(f"Response Text: {response_text}")
-        raise je
+        prompt = build_portfolio_prompt(data, resume_text)
+        logging.debug(f"Prompt token counts: {prompt.token_counts}")
+        ai_message = invoke_llm(prompt.text, "llm.generate")
+        return parse_portfolio_response(ai_message.content)
+    except PortfolioParseError as pe:
+        raise pe
     except Exception as e:
         logging.error(f"Error generating portfolio: {e}")
-        raise e
\ No newline at end of file
+        raise e
@@ -0,0 +1,140 @@
+import time
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import Config
+
+_NO_FALLBACK = object()
+
+class StageTimeoutError(TimeoutError):
+    pass
+
+stage_executor = ThreadPoolExecutor(max_workers=Config.STAGE_WORKERS, thread_name_prefix="stage")
+
+# Callables invoked with every finished StageRun (benchmarks, metrics).
+# Observer errors are logged and never fail the request.
+stage_observers = []
+
+def add_stage_observer(observer):
+    stage_observers.append(observer)
+    return observer
+
+def notify_stage_observers(run):
+    for observer in stage_observers:
+        try:
+            observer(run)
+        except Exception as e:
+            logging.error(f"Stage observer failed: {e}")
+
+def _run_started(clock, func, kwargs):
+    # Marks when the stage actually starts on a pool thread, so time spent
+    # queued behind other requests' stages does not count against it.
+    clock[0] = time.perf_counter()
+    return func(**kwargs)
+
+# How often queued stages are checked for having started
+_START_POLL_SECONDS = 0.05
+
+class Stage:
+    def __init__(self, name, func, deps=(), timeout=None, fallback=_NO_FALLBACK):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+class StageGraph:
+    # Runs each stage as soon as all of its dependencies have finished, so
+    # independent stages overlap. A stage that fails or exceeds its deadline
+    # resolves to its fallback value when it has one; otherwise the whole
+    # graph fails. Stage functions receive their dependencies' results as
+    # keyword arguments.
+    def __init__(self, executor=None):
+        self.executor = executor or stage_executor
+        self.stages = {}
+        self.resolved = {}
+
+    def resolve(self, name, value):
+        # A stage whose result is already known (computed by the caller);
+        # dependents start immediately and no timing is recorded for it.
+        self.resolved[name] = value
+        return self
+
+    def add(self, name, func, deps=(), timeout=None, fallback=_NO_FALLBACK):
+        for dep in deps:
+            if dep not in self.stages and dep not in self.resolved:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'.")
+        self.stages[name] = Stage(name, func, deps, timeout, fallback)
+        return self
+
+    def run(self):
+        results = dict(self.resolved)
+        timings = {}
+        degraded = []
+        running = {}
+        pending = dict(self.stages)
+
+        def resolve(stage, started, error):
+            if stage.fallback is _NO_FALLBACK:
+                raise error
+            logging.warning(f"Stage '{stage.name}' degraded: {error}")
+            results[stage.name] = stage.fallback
+            timings[stage.name] = time.perf_counter() - started
+            degraded.append(stage.name)
+
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        kwargs = {dep: results[dep] for dep in stage.deps}
+                        clock = [None]
+                        future = self.executor.submit(contextvars.copy_context().run, _run_started, clock, stage.func, kwargs)
+                        running[future] = (stage, clock)
+                        del pending[name]
+
+                if not running:
+                    raise RuntimeError(f"Stages {sorted(pending)} can never run.")
+
+                # A deadline runs from the stage's start; stages still queued
+                # for a thread are re-checked shortly.
+                now = time.perf_counter()
+                deadlines = []
+                for stage, clock in running.values():
+                    if stage.timeout:
+                        deadlines.append(clock[0] + stage.timeout - now if clock[0] is not None else _START_POLL_SECONDS)
+                done, _ = wait(list(running), timeout=max(0, min(deadlines)) if deadlines else None,
+                               return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, clock = running.pop(future)
+                    try:
+                        results[stage.name] = future.result()
+                        timings[stage.name] = time.perf_counter() - clock[0]
+                    except Exception as e:
+                        resolve(stage, clock[0] or time.perf_counter(), e)
+
+                now = time.perf_counter()
+                for future, (stage, clock) in list(running.items()):
+                    if stage.timeout and clock[0] is not None and now - clock[0] >= stage.timeout:
+                        # The abandoned call finishes in the background; its
+                        # result is discarded.
+                        del running[future]
+                        resolve(stage, clock[0], StageTimeoutError(
+                            f"Stage '{stage.name}' exceeded its {stage.timeout}s deadline."))
+        finally:
+            for future in running:
+                future.cancel()
+
+        run = StageRun(results, timings, degraded)
+        if stage_observers:
+            notify_stage_observers(run)
+        return run
+
+class StageRun:
+    def __init__(self, results, timings, degraded):
+        self.results = results
+        self.timings = timings
+        self.degraded = degraded
+
+    def __getitem__(self, name):
+        return self.results[name]
@@ -0,0 +1,148 @@
+import json
+import logging
+from config import Config
+from services import build_portfolio_prompt, parse_portfolio_response
+from llm import get_llm, llm_scheduler, LLMOverloadedError
+from metrics import span, record_llm_usage
+
+STREAMED_ARRAYS = ("projects", "experience")
+
+class IncrementalPortfolioParser:
+    # Scans the model output as it arrives and reports each top-level field
+    # of the portfolio object once its value is complete. Items of the
+    # 'projects' and 'experience' arrays are reported one by one instead of
+    # waiting for the whole array. Text before the first '{' (a code fence,
+    # stray prose) is skipped.
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.started = False
+        self.finished = False
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.expecting_key = False
+        self.key = None
+        self.value_start = None
+        self.item_start = None
+        self.item_index = 0
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        while self.position < len(text) and not self.finished:
+            char = text[self.position]
+            index = self.position
+            self.position += 1
+
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self.stack.append("{")
+                    self.expecting_key = True
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1 and self.expecting_key:
+                        self.key = json.loads(text[self.string_start:index + 1])
+                continue
+
+            depth = len(self.stack)
+            if char == '"':
+                self.in_string = True
+                self.string_start = index
+                if depth == 1 and not self.expecting_key and self.value_start is None:
+                    self.value_start = index
+            elif char in "{[":
+                if depth == 1 and self.value_start is None:
+                    self.value_start = index
+                    self.item_index = 0
+                if depth == 2 and char == "{" and self._streaming_array():
+                    self.item_start = index
+                self.stack.append(char)
+            elif char in "}]":
+                self.stack.pop()
+                depth = len(self.stack)
+                if depth == 2 and char == "}" and self.item_start is not None:
+                    events.append(("item", self.key, self.item_index,
+                                   json.loads(text[self.item_start:index + 1])))
+                    self.item_start = None
+                    self.item_index += 1
+                elif depth == 0:
+                    self._close_value(text, index, events)
+                    self.finished = True
+            elif depth == 1:
+                if char == ":":
+                    self.expecting_key = False
+                elif char == ",":
+                    self._close_value(text, index, events)
+                elif not char.isspace() and self.value_start is None and not self.expecting_key:
+                    self.value_start = index
+        return events
+
+    def _streaming_array(self):
+        return self.key in STREAMED_ARRAYS and self.stack[-1] == "["
+
+    def _close_value(self, text, end, events):
+        if self.key is not None and self.value_start is not None:
+            raw = text[self.value_start:end].strip()
+            if self.key not in STREAMED_ARRAYS or not raw.startswith("["):
+                events.append(("field", self.key, None, json.loads(raw)))
+        self.key = None
+        self.value_start = None
+        self.expecting_key = True
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def stream_portfolio_events(data, resume_text):
+    # Yields Server-Sent Events: 'field' for each completed top-level field,
+    # 'project' / 'experience' for each completed array item, then 'done'
+    # with the fully parsed document (or 'error').
+    parser = IncrementalPortfolioParser()
+    chunks = []
+    usage_chunk = None
+    try:
+        llm = get_llm()
+        prompt = build_portfolio_prompt(data, resume_text).text
+        with llm_scheduler.slot(), span("llm.stream"):
+            for message_chunk in llm.stream(prompt):
+                # Token usage arrives with the final chunk, which may carry no text
+                if getattr(message_chunk, "usage_metadata", None):
+                    usage_chunk = message_chunk
+                content = message_chunk.content
+                if not content:
+                    continue
+                chunks.append(content)
+                try:
+                    events = parser.feed(content)
+                except ValueError as ve:
+                    # Malformed partial output; the final parse decides the outcome
+                    logging.warning(f"Incremental parse stopped: {ve}")
+                    parser.finished = True
+                    events = []
+                for kind, key, item_index, value in events:
+                    if kind == "item":
+                        event = "project" if key == "projects" else "experience"
+                        yield sse_event(event, {"index": item_index, "value": value})
+                    else:
+                        yield sse_event("field", {"field": key, "value": value})
+        record_llm_usage(Config.LLM_MODEL, usage_chunk)
+
+        yield sse_event("done", parse_portfolio_response("".join(chunks)))
+    except LLMOverloadedError as oe:
+        yield sse_event("error", {"error": str(oe), "status": 429, "retry_after": oe.retry_after})
+    except ValueError as ve:
+        logging.error(f"Streaming generation failed: {ve}")
+        yield sse_event("error", {"error": str(ve), "status": 502})
+    except Exception as e:
+        logging.error(f"Streaming generation failed: {e}", exc_info=True)
+        yield sse_event("error", {"error": "Internal Server Error.", "status": 500})
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import mongomock
+import pytest
+
+# Config reads the environment at import time
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+os.environ.setdefault("RESUME_CACHE_DIR", tempfile.mkdtemp(prefix="resume-cache-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db as db_module
+
+
+@pytest.fixture
+def database(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db_module, "MongoClient", lambda *args, **kwargs: client)
+    return db_module.Database()
@@ -0,0 +1,40 @@
+import os
+
+
+def make_pdf(pages, lines_per_page=40, padding_bytes=0):
+    # Minimal uncompressed PDF with one Helvetica text stream per page. The
+    # optional padding stream on each page mimics the bulk of a scanned deck.
+    objects = []
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for page_number in range(pages):
+        lines = [f"Page {page_number + 1} line {i}: Senior engineer building scalable web platforms." for i in range(lines_per_page)]
+        text = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text.encode("latin-1")))
+        resources = f"<< /Font << /F1 {font} 0 R >> >>"
+        if padding_bytes:
+            padding = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (padding_bytes, os.urandom(padding_bytes)))
+            resources = f"<< /Font << /F1 {font} 0 R >> /XObject << >> /Padding {padding} 0 R >>"
+        kids.append(add(f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 612 842] "
+                        f"/Contents {content} 0 R /Resources {resources} >>".encode("latin-1")))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode("latin-1")
+    objects[pages_obj - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] "
+                              f"/Count {len(kids)} >>").encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
@@ -0,0 +1,56 @@
+import os
+import time
+
+import cache
+from cache import ResumeTextCache, ValidatorStore, prune_cache_dir
+
+
+def age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_prune_drops_oldest_entries_over_size_limit(tmp_path):
+    text_cache = ResumeTextCache(cache_dir=str(tmp_path))
+    for index in range(4):
+        text_cache.put(f"https://example.com/{index}.pdf", "hash", "x" * 1000)
+        age(text_cache._path(text_cache.make_key(f"https://example.com/{index}.pdf", "hash")), 100 - index)
+
+    removed = prune_cache_dir(str(tmp_path), max_bytes=2500, ttl_seconds=0)
+    assert removed == 2
+    assert ResumeTextCache(cache_dir=str(tmp_path)).get("https://example.com/0.pdf", "hash") is None
+    assert ResumeTextCache(cache_dir=str(tmp_path)).get("https://example.com/3.pdf", "hash") == "x" * 1000
+
+
+def test_prune_expires_entries_and_stale_temp_files(tmp_path):
+    validators = ValidatorStore(cache_dir=str(tmp_path))
+    validators.put("https://example.com/old.pdf", '"a"', None, "hash-a")
+    validators.put("https://example.com/new.pdf", '"b"', None, "hash-b")
+    age(validators._path("https://example.com/old.pdf"), 3600)
+    orphan = tmp_path / "orphan.tmp"
+    orphan.write_text("{")
+    age(str(orphan), cache.STALE_TMP_SECONDS + 1)
+
+    assert prune_cache_dir(str(tmp_path), max_bytes=10 ** 9, ttl_seconds=600) == 2
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(validators._path("https://example.com/new.pdf"))]
+
+
+def test_disk_reads_refresh_entry_age(tmp_path):
+    text_cache = ResumeTextCache(cache_dir=str(tmp_path))
+    text_cache.put("https://example.com/cv.pdf", "hash", "resume text")
+    path = text_cache._path(text_cache.make_key("https://example.com/cv.pdf", "hash"))
+    age(path, 3600)
+
+    assert ResumeTextCache(cache_dir=str(tmp_path)).get("https://example.com/cv.pdf", "hash") == "resume text"
+    assert prune_cache_dir(str(tmp_path), max_bytes=10 ** 9, ttl_seconds=600) == 0
+
+
+def test_writes_prune_the_shared_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache.Config, "RESUME_CACHE_DISK_MAX_BYTES", 3000)
+    monkeypatch.setattr(cache.Config, "RESUME_CACHE_DISK_PRUNE_INTERVAL", 3600)
+    text_cache = ResumeTextCache(cache_dir=str(tmp_path))
+    for index in range(10):
+        text_cache.put(f"https://example.com/{index}.pdf", "hash", "x" * 1000)
+
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 3000
+    assert text_cache.stats()["disk_evictions"] > 0
@@ -0,0 +1,83 @@
+import pytest
+from bson import ObjectId
+
+
+def seed(database, user=True, freelancer=True):
+    user_id = ObjectId()
+    if user:
+        database.users_collection.insert_one({
+            "_id": user_id, "first_name": "Ada", "last_name": "Lovelace",
+            "github_profile": "https://github.com/ada", "email": "ada@example.com", "password": "secret"
+        })
+    if freelancer:
+        database.freelancers_collection.insert_one({
+            "user_id": user_id, "name": "Ada L.", "work_description": "<p>Engines</p>",
+            "skills": ["Python"], "tools": ["Git"], "resume": {"url": "https://example.com/cv.pdf", "size": 1024},
+            "bank_details": {"iban": "XX00"}
+        })
+    return user_id
+
+
+def test_get_profile_joins_user_and_freelancer(database):
+    user_id = seed(database)
+    user, freelancer = database.get_profile(str(user_id))
+    assert user["first_name"] == "Ada"
+    assert freelancer["work_description"] == "<p>Engines</p>"
+    assert freelancer["resume"] == {"url": "https://example.com/cv.pdf"}
+
+
+def test_get_profile_user_without_freelancer(database):
+    user_id = seed(database, freelancer=False)
+    user, freelancer = database.get_profile(str(user_id))
+    assert user["last_name"] == "Lovelace"
+    assert freelancer is None
+
+
+def test_get_profile_falls_back_to_freelancer_only(database):
+    user_id = seed(database, user=False)
+    user, freelancer = database.get_profile(str(user_id))
+    assert user is None
+    assert freelancer["name"] == "Ada L."
+
+
+def test_get_profile_unknown_user(database):
+    assert database.get_profile(str(ObjectId())) == (None, None)
+
+
+def test_get_profile_projects_only_pipeline_fields(database):
+    user_id = seed(database)
+    user, freelancer = database.get_profile(str(user_id))
+    assert "email" not in user and "password" not in user
+    assert "bank_details" not in freelancer
+    assert "size" not in freelancer["resume"]
+
+
+class StubCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def explain(self):
+        return self.plan
+
+
+def stub_plan(database, monkeypatch, winning_plan):
+    monkeypatch.setattr(database.freelancers_collection, "find",
+                        lambda *args, **kwargs: StubCursor({"queryPlanner": {"winningPlan": winning_plan}}))
+
+
+def test_check_query_plans_accepts_index_scan(database, monkeypatch):
+    stub_plan(database, monkeypatch, {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "user_id_1"}})
+    database.check_query_plans()
+
+
+def test_check_query_plans_rejects_collection_scan(database, monkeypatch):
+    stub_plan(database, monkeypatch, {"stage": "COLLSCAN", "direction": "forward"})
+    with pytest.raises(RuntimeError):
+        database.check_query_plans()
+
+
+def test_ensure_indexes_creates_user_id_index(database, monkeypatch):
+    stub_plan(database, monkeypatch, {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}})
+    database.ensure_indexes()
+    keys = [index["key"] for index in database.freelancers_collection.index_information().values()]
+    assert [("user_id", 1)] in keys
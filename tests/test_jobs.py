@@ -0,0 +1,36 @@
+import pytest
+from bson import ObjectId
+
+from jobs import InMemoryJobStore, JobManager
+from pipeline import UserNotFoundError
+from stages import StageTimeoutError
+
+
+def run_job(runner):
+    manager = JobManager(InMemoryJobStore(), runner, max_workers=1)
+    try:
+        job, _ = manager.submit(str(ObjectId()))
+    finally:
+        manager.shutdown(wait=True)
+    return manager.get(job["job_id"])
+
+
+@pytest.mark.parametrize("error, status", [
+    (StageTimeoutError("Stage 'generate' exceeded its 60s deadline."), 504),
+    (UserNotFoundError("User not found."), 404),
+    (RuntimeError("boom"), 500)
+])
+def test_failed_jobs_report_the_sync_status(error, status):
+    def runner(user_id):
+        raise error
+
+    job = run_job(runner)
+    assert job["status"] == "failed"
+    assert job["error_status"] == status
+
+
+def test_timed_out_job_reports_timeout_message():
+    def runner(user_id):
+        raise StageTimeoutError("Stage 'generate' exceeded its 60s deadline.")
+
+    assert run_job(runner)["error"] == "Portfolio generation timed out."
@@ -0,0 +1,56 @@
+import pytest
+from bson import ObjectId
+
+import pipeline
+from coalesce import SingleFlight
+from portfolio_store import PortfolioStore
+
+
+@pytest.fixture
+def profile(database):
+    user_id = ObjectId()
+    database.users_collection.insert_one({"_id": user_id, "first_name": "Ada", "last_name": "Lovelace"})
+    database.freelancers_collection.insert_one({
+        "user_id": user_id, "name": "Ada", "work_description": "Engines", "skills": [], "tools": [],
+        "resume": {"url": "https://example.com/cv.pdf"}
+    })
+    return str(user_id)
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    resumes = []
+
+    def regenerate(details, resume_text, previous=None, previous_fingerprints=None):
+        resumes.append(resume_text)
+        return {"full_name": details["full_name"]}, [], {}
+
+    monkeypatch.setattr(pipeline, "regenerate_portfolio", regenerate)
+    return resumes
+
+
+def serve(database, user_id):
+    store = PortfolioStore(database.portfolios_collection)
+    return pipeline.serve_portfolio(database, user_id, SingleFlight(), store)[1]["source"]
+
+
+def test_failed_resume_download_degrades_and_is_not_stored(database, profile, generations, monkeypatch):
+    def refuse(url):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(pipeline, "extract_text_from_pdf_url", refuse)
+    run = pipeline.build_stage_graph(database, profile, generate=False).run()
+    assert run["resume"] is None and run.degraded == ["resume"]
+
+    assert serve(database, profile) == "generated"
+    assert database.portfolios_collection.count_documents({}) == 0
+
+
+def test_changed_resume_content_regenerates_stored_portfolio(database, profile, generations, monkeypatch):
+    monkeypatch.setattr(pipeline, "extract_text_from_pdf_url", lambda url: "first resume")
+    assert serve(database, profile) == "generated"
+    assert serve(database, profile) == "stored"
+
+    monkeypatch.setattr(pipeline, "extract_text_from_pdf_url", lambda url: "updated resume")
+    assert serve(database, profile) == "generated"
+    assert generations == ["first resume", "updated resume"]
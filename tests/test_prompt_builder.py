@@ -0,0 +1,67 @@
+from config import Config
+from prompt_builder import build_prompt, compress_resume, estimate_tokens
+from services import render_portfolio_prompt
+
+DATA = {
+    "full_name": "Jane Doe", "about": "Engineer",
+    "services": [{"category": "WEB DEVELOPMENT", "services": ["React", "Node.js"]}], "tools": ["Docker"]
+}
+
+
+def long_resume(roles, page_every=10):
+    lines = ["Jane Doe", "jane@example.com | +1 555 0100", "Professional Summary",
+             "Backend engineer who builds reliable web platforms."]
+    lines.append("Work Experience")
+    for index in range(roles):
+        if index and index % page_every == 0:
+            lines += [f"Page {index // page_every}", "Jane Doe - Resume"]
+        lines += [f"Senior Engineer, Company {index}", "01/2015 - 12/2016"]
+        lines += [f"Built service {index}-{bullet} handling millions of requests per day with Python and Go."
+                  for bullet in range(4)]
+    lines.append("Projects")
+    lines += [f"Open source tool {index}: a command line utility for log analysis." for index in range(20)]
+    lines.append("Education")
+    lines += ["BSc Computer Science, State University"]
+    lines.append("Hobbies and Interests")
+    lines += [f"Interest number {index}" for index in range(300)]
+    lines.append("References available on request")
+    return "\n".join(lines)
+
+
+def build(resume):
+    return build_prompt(lambda text: render_portfolio_prompt(DATA, text), resume)
+
+
+def test_long_resume_fits_budget_and_shrinks_prompt():
+    resume = long_resume(200)
+    uncompressed = estimate_tokens(render_portfolio_prompt(DATA, resume))
+    prompt = build(resume)
+
+    assert uncompressed > Config.PROMPT_TOKEN_BUDGET
+    assert prompt.token_counts["total"] <= Config.PROMPT_TOKEN_BUDGET
+    assert estimate_tokens(prompt.text) < uncompressed
+    assert prompt.token_counts["truncated_sections"]
+
+
+def test_headings_survive_compression():
+    # Over budget, but the high-priority sections fit once the rest is trimmed
+    prompt = build(long_resume(45))
+    assert "interests" in prompt.token_counts["truncated_sections"]
+    assert prompt.token_counts["total"] <= Config.PROMPT_TOKEN_BUDGET
+    for heading in ("Professional Summary", "Work Experience", "Projects"):
+        assert heading in prompt.text
+    assert "Senior Engineer, Company 44" in prompt.text
+    assert "Interest number 299" not in prompt.text
+    assert "References available on request" not in prompt.text
+
+
+def test_repeated_lines_are_kept_under_budget():
+    resume = long_resume(3)
+    compressed, counts = compress_resume(resume.replace("Company 1", "Company 0"), 10 ** 6)
+    assert compressed.count("Senior Engineer, Company 0") == 2
+    assert counts["truncated_sections"] == []
+
+
+def test_page_furniture_is_dropped_when_trimming():
+    compressed, _ = compress_resume(long_resume(60), 1500)
+    assert "Jane Doe - Resume" not in compressed
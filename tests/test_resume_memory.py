@@ -0,0 +1,68 @@
+import io
+import tracemalloc
+
+import pytest
+
+import services
+from config import Config
+from pdfs import make_pdf
+
+
+class StreamedResponse:
+    def __init__(self, body, declare_length=True):
+        self.body = body
+        self.headers = {"Content-Length": str(len(body))} if declare_length else {}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        view = memoryview(self.body)
+        for start in range(0, len(self.body), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+
+@pytest.fixture(scope="module")
+def large_pdf():
+    # About 18 MB: a scanned-deck sized document just under RESUME_MAX_BYTES
+    return make_pdf(60, padding_bytes=300 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def inline_extraction(monkeypatch):
+    # Worker processes are outside tracemalloc; parse in this process
+    monkeypatch.setattr(Config, "PDF_WORKERS", 1)
+
+
+def peak_ingest(response):
+    tracemalloc.start()
+    try:
+        with services.download_resume(response) as (spool, _):
+            spooled_to_disk = not isinstance(spool, io.BytesIO)
+            text = services.extract_text_from_pdf(spool)
+        return text, spooled_to_disk, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("declare_length", [True, False])
+def test_large_pdf_stays_under_peak_memory_ceiling(large_pdf, declare_length):
+    assert len(large_pdf) > 2 * Config.RESUME_PEAK_MEMORY_BYTES
+    text, spooled_to_disk, peak = peak_ingest(StreamedResponse(large_pdf, declare_length))
+    assert text
+    assert spooled_to_disk
+    assert peak <= Config.RESUME_PEAK_MEMORY_BYTES
+
+
+def test_lower_ceiling_lowers_spool_threshold(large_pdf, monkeypatch):
+    monkeypatch.setattr(Config, "RESUME_PEAK_MEMORY_BYTES", 4 * 1024 * 1024)
+    assert services.spool_threshold() == 1024 * 1024
+    _, _, peak = peak_ingest(StreamedResponse(large_pdf, declare_length=False))
+    assert peak <= Config.RESUME_PEAK_MEMORY_BYTES
+
+
+def test_oversized_resume_is_rejected_before_download(monkeypatch):
+    monkeypatch.setattr(Config, "RESUME_MAX_BYTES", 1024)
+    with pytest.raises(services.ResumeTooLargeError):
+        with services.download_resume(StreamedResponse(b"%PDF" + b"0" * 2048)):
+            pass
@@ -0,0 +1,49 @@
+import pytest
+
+from services import NARRATIVE_SECTIONS, render_section_prompt, section_fingerprints
+
+PROFILE = {
+    "full_name": "Ada Lovelace",
+    "about": "Engines",
+    "services": [{"category": "Development", "services": ["Backend"]}],
+    "tools": ["Git"],
+    "github_link": "https://github.com/ada",
+    "profile_photo": "https://example.com/ada.png"
+}
+
+
+def changed_sections(field, value):
+    before = section_fingerprints(PROFILE, "resume")
+    after = section_fingerprints({**PROFILE, field: value}, "resume")
+    return [section for section in NARRATIVE_SECTIONS if before[section] != after[section]]
+
+
+def test_name_changes_every_section():
+    assert changed_sections("full_name", "Ada King") == NARRATIVE_SECTIONS
+
+
+def test_about_changes_sections_that_render_it():
+    assert changed_sections("about", "Analytical engines") == ["about", "projects"]
+    assert "Analytical engines" not in render_section_prompt("experience", {**PROFILE, "about": "Analytical engines"}, "")
+
+
+def test_resume_changes_every_section():
+    before = section_fingerprints(PROFILE, "resume")
+    after = section_fingerprints(PROFILE, "updated resume")
+    assert all(before[section] != after[section] for section in NARRATIVE_SECTIONS)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("github_link", "https://github.com/countess"),
+    ("profile_photo", None),
+    ("services", [{"category": "Design", "services": ["UI"]}]),
+    ("tools", ["Git", "Docker"])
+])
+def test_deterministic_fields_keep_fingerprints(field, value):
+    assert changed_sections(field, value) == []
+
+
+@pytest.mark.parametrize("section", NARRATIVE_SECTIONS)
+def test_section_prompts_leave_out_services_and_tools(section):
+    prompt = render_section_prompt(section, PROFILE, "resume")
+    assert "Development" not in prompt and "Git" not in prompt
@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+
+import streaming
+from config import Config
+from metrics import llm_tokens_total, span_seconds
+
+
+class FakeStreamingLLM:
+    def __init__(self, text):
+        self.text = text
+
+    def stream(self, prompt):
+        for start in range(0, len(self.text), 7):
+            yield SimpleNamespace(content=self.text[start:start + 7], usage_metadata=None)
+        yield SimpleNamespace(content="", usage_metadata={"input_tokens": 120, "output_tokens": 45})
+
+
+def test_stream_records_span_and_usage(monkeypatch):
+    portfolio = {"full_name": "Ada", "about": "Engines", "services": [], "tools": [], "projects": [], "experience": []}
+    monkeypatch.setattr(streaming, "get_llm", lambda: FakeStreamingLLM(json.dumps(portfolio)))
+    data = {"full_name": "Ada", "about": "Engines", "services": [], "tools": []}
+
+    input_before = llm_tokens_total.value(model=Config.LLM_MODEL, direction="input")
+    output_before = llm_tokens_total.value(model=Config.LLM_MODEL, direction="output")
+    events = list(streaming.stream_portfolio_events(data, "resume"))
+
+    assert events[-1].startswith("event: done")
+    assert llm_tokens_total.value(model=Config.LLM_MODEL, direction="input") == input_before + 120
+    assert llm_tokens_total.value(model=Config.LLM_MODEL, direction="output") == output_before + 45
+    assert 'span="llm.stream"' in "\n".join(span_seconds.render())
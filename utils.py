@@ -1,19 +1,117 @@
-from flask import jsonify
+import gzip
+import json
+import hashlib
 import logging
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from config import Config
 
-def error_response(message, status_code=400):
-    response = jsonify({"error": message})
-    response.status_code = status_code
+# Optional accelerators: orjson for encoding and brotli for compression.
+# Without them responses fall back to the json module and gzip.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Flask is imported inside the response helpers so that setup_logging does
+# not pull it into the Lambda handler's cold start.
+
+def _default(value):
+    # Dates keep the HTTP-date format Flask's jsonify used; anything else
+    # (ObjectId, Decimal) is sent as its string form.
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+    if isinstance(value, date):
+        return format_datetime(datetime(value.year, value.month, value.day, tzinfo=timezone.utc), usegmt=True)
+    return str(value)
+
+def dumps(data):
+    # Compact UTF-8 with sorted keys, the same bytes with either encoder, so
+    # an ETag does not depend on which one is installed.
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                            | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def content_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def _matching_etag(if_none_match, etag):
+    # Returns the client's tag that names 'etag' (compressed variants carry
+    # a '-gzip'/'-br' suffix on the same tag), or None.
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        base = tag[2:] if tag.startswith("W/") else tag
+        for suffix in ('-gzip"', '-br"'):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)] + '"'
+        if base == etag:
+            return tag
+    return None
+
+def _negotiate_encoding(request, size):
+    if size < Config.RESPONSE_COMPRESS_MIN_BYTES:
+        return None
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=Config.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL)
+
+def json_response(data, status_code=200, etag=None, conditional=False):
+    # 'conditional' responses get a strong ETag from their content and
+    # answer a matching If-None-Match with 304. A caller that already knows
+    # the content's ETag (a stored portfolio) skips serialization on a 304.
+    from flask import Response, request
+    body = None
+    if conditional:
+        if etag is None:
+            body = dumps(data)
+            etag = content_etag(body)
+        matched = _matching_etag(request.headers.get("If-None-Match"), etag)
+        if matched:
+            return _not_modified(Response, matched)
+    if body is None:
+        body = dumps(data)
+
+    response = Response(body, status=status_code, mimetype="application/json")
+    if len(body) >= Config.RESPONSE_COMPRESS_MIN_BYTES:
+        response.vary.add("Accept-Encoding")
+    encoding = _negotiate_encoding(request, len(body))
+    if encoding:
+        response.set_data(_compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    if conditional:
+        response.headers["ETag"] = etag[:-1] + f'-{encoding}"' if encoding else etag
     return response
 
-def success_response(data, status_code=200):
-    response = jsonify(data)
-    response.status_code = status_code
+def _not_modified(response_class, etag):
+    response = response_class(status=304)
+    response.headers["ETag"] = etag
+    response.vary.add("Accept-Encoding")
     return response
 
+def error_response(message, status_code=400):
+    return json_response({"error": message}, status_code)
+
+def success_response(data, status_code=200, etag=None):
+    return json_response(data, status_code, etag, conditional=status_code == 200)
+
 def setup_logging():
     logging.basicConfig(level=logging.ERROR,
                         format='%(asctime)s %(levelname)s %(name)s %(message)s',
                         handlers=[
                             logging.StreamHandler()
-                        ])
\ No newline at end of file
+                        ])